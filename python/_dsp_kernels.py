@@ -0,0 +1,87 @@
+"""Hot DSP recurrence kernels shared by the audio preprocessing chain.
+
+音频链里无法向量化的状态递推(一阶 HPF、增益平滑)集中在这里:
+numba 可用时 JIT 成原生循环,否则高通回退到 scipy 的 C 实现,
+两者都缺席时退回纯 Python 参考实现。service 启动时调用
+warm_dsp_kernels() 把 JIT 编译挪到热路径之外。
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+try:
+    import numba
+except Exception:  # pragma: no cover - optional runtime import
+    numba = None
+
+try:
+    from scipy.signal import lfilter as _scipy_lfilter, lfiltic as _scipy_lfiltic
+except Exception:  # pragma: no cover - optional runtime import
+    _scipy_lfilter = None
+    _scipy_lfiltic = None
+
+
+def _hpf_kernel_impl(signal: np.ndarray, alpha: float, out: np.ndarray) -> None:
+    out[0] = signal[0]
+    prev_y = signal[0]
+    prev_x = signal[0]
+    for i in range(1, signal.size):
+        x = signal[i]
+        prev_y = alpha * (prev_y + x - prev_x)
+        out[i] = prev_y
+        prev_x = x
+
+
+def _lvb_smooth_impl(desired_db: np.ndarray, out: np.ndarray) -> tuple[float, float]:
+    """Attack/release smoothing recurrence over per-frame desired gains.
+
+    Returns (average gain dB, peak gain dB) over all frames.
+    """
+    current_gain_db = 0.0
+    gain_sum = 0.0
+    gain_peak = 0.0
+    for i in range(desired_db.size):
+        desired = desired_db[i]
+        smoothing = 0.25 if desired > current_gain_db else 0.08
+        current_gain_db += smoothing * (desired - current_gain_db)
+        out[i] = current_gain_db
+        gain_sum += current_gain_db
+        if current_gain_db > gain_peak:
+            gain_peak = current_gain_db
+    if desired_db.size == 0:
+        return 0.0, 0.0
+    return gain_sum / desired_db.size, gain_peak
+
+
+def _hpf_kernel_lfilter(signal: np.ndarray, alpha: float, out: np.ndarray) -> None:
+    # y[n] = α(y[n-1] + x[n] - x[n-1]) 等价于 b=[α,-α], a=[1,-α] 的 IIR;
+    # 初始状态按 out[0] == signal[0] 反推,和纯 Python 递推逐位一致。
+    b = np.array([alpha, -alpha], dtype=np.float64)
+    a = np.array([1.0, -alpha], dtype=np.float64)
+    x0 = float(signal[0])
+    zi = _scipy_lfiltic(b, a, [x0 / alpha], [x0])
+    filtered, _ = _scipy_lfilter(b, a, signal, zi=zi)
+    out[:] = filtered
+
+
+if numba is not None:
+    hpf_kernel = numba.njit(cache=True, fastmath=True)(_hpf_kernel_impl)
+    lvb_smooth = numba.njit(cache=True, fastmath=True)(_lvb_smooth_impl)
+else:
+    hpf_kernel = _hpf_kernel_lfilter if _scipy_lfilter is not None else _hpf_kernel_impl
+    lvb_smooth = _lvb_smooth_impl
+
+
+def warm_dsp_kernels() -> None:
+    """Trigger Numba compilation off the hot path; no-op without numba."""
+    if numba is None:
+        return
+    try:
+        dummy = np.zeros(2, dtype=np.float32)
+        scratch = np.empty_like(dummy)
+        hpf_kernel(dummy, 0.99, scratch)
+        desired = np.zeros(2, dtype=np.float64)
+        lvb_smooth(desired, np.empty_like(desired))
+    except Exception:
+        pass
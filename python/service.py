@@ -10,12 +10,16 @@ Exposes three routes:
 from __future__ import annotations
 
 import argparse
-from collections import deque
+import asyncio
+import copy
 import gc
+import hashlib
 import inspect
+import io
 import json
 import math
 import os
+import queue
 import re
 import shutil
 import subprocess
@@ -24,17 +28,17 @@ import tempfile
 import threading
 import time
 import wave
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager, contextmanager
 from dataclasses import dataclass
-from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any
 
 import numpy as np
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.responses import JSONResponse, StreamingResponse
-from mlx_lm import load, stream_generate
-import mlx_whisper
+from functools import lru_cache
+
 try:
     import mlx_audio
     from mlx_audio.stt import load as load_mlx_audio_model
@@ -42,14 +46,105 @@ except ImportError:
     mlx_audio = None
     load_mlx_audio_model = None
 
-from pydantic import BaseModel, Field
-
-from audio_io import WavFormatError, load_wav_pcm16_mono
+from pydantic import BaseModel, ConfigDict, Field
 
 try:
-    from duckduckgo_search import DDGS
+    import orjson
 except Exception:  # pragma: no cover - optional runtime import
-    DDGS = None
+    orjson = None
+
+from _dsp_kernels import hpf_kernel, lvb_smooth, warm_dsp_kernels
+from audio_io import WavFormatError, load_wav_pcm16_mono, read_wav_metadata
+
+
+# 重量级可选依赖全部延迟到首次使用时再导入：/health 与纯 ASR 请求
+# 不需要为 mlx_lm / duckduckgo_search 的导入买单。
+@lru_cache(maxsize=1)
+def _mlx_lm():
+    """Import mlx_lm on first use and return (load, stream_generate)."""
+    from mlx_lm import load, stream_generate
+
+    return load, stream_generate
+
+
+@lru_cache(maxsize=1)
+def _mlx_whisper():
+    """Import mlx_whisper on first use."""
+    import mlx_whisper
+
+    return mlx_whisper
+
+
+@lru_cache(maxsize=1)
+def _huggingface_hub():
+    """Import huggingface_hub on first use."""
+    import huggingface_hub
+
+    return huggingface_hub
+
+
+@lru_cache(maxsize=1)
+def _mlx_core():
+    try:
+        import mlx.core as mx
+    except Exception:  # pragma: no cover - optional runtime import
+        return None
+    return mx
+
+
+@lru_cache(maxsize=1)
+def _make_prompt_cache_fn():
+    try:
+        from mlx_lm.models.cache import make_prompt_cache
+    except Exception:  # pragma: no cover - older mlx-lm layouts
+        try:
+            from mlx_lm.utils import make_prompt_cache  # type: ignore
+        except Exception:
+            return None
+    return make_prompt_cache
+
+
+@lru_cache(maxsize=1)
+def _lightning_whisper_cls():
+    try:
+        from lightning_whisper_mlx import LightningWhisperMLX
+    except Exception:  # pragma: no cover - optional runtime import
+        return None
+    return LightningWhisperMLX
+
+
+@lru_cache(maxsize=1)
+def _silero_vad_session():
+    """ONNX Silero VAD session, or None when onnxruntime/the model is absent.
+
+    模型路径通过 GHOSTTYPE_SILERO_VAD_ONNX 指定;未配置时静默回退到
+    webrtcvad / 能量门限,保持 onnxruntime 纯可选。
+    """
+    try:
+        import onnxruntime
+    except Exception:  # pragma: no cover - optional runtime import
+        return None
+    model_path = str(os.environ.get("GHOSTTYPE_SILERO_VAD_ONNX") or "").strip()
+    if not model_path or not Path(model_path).exists():
+        return None
+    for providers in (
+        ["CoreMLExecutionProvider", "CPUExecutionProvider"],
+        ["CPUExecutionProvider"],
+    ):
+        try:
+            return onnxruntime.InferenceSession(model_path, providers=providers)
+        except Exception:
+            continue
+    return None
+
+
+@lru_cache(maxsize=1)
+def _ddgs_cls():
+    try:
+        from duckduckgo_search import DDGS
+    except Exception:  # pragma: no cover - optional runtime import
+        return None
+    return DDGS
 
 try:
     import webrtcvad
@@ -92,10 +187,76 @@ except Exception:  # pragma: no cover - fallback when module is unavailable
 LLM_REPO = "mlx-community/Qwen2.5-1.5B-Instruct-4bit"
 ASR_REPO = "mlx-community/whisper-small-mlx"
 
+# Batched decoder configuration (lightning-whisper-mlx). Batching the Whisper
+# encoder over multiple 30-second windows amortizes the memory-bound encoder
+# FFNs across a single kernel launch; only worthwhile for long clips.
+#
+# Default checkpoint is distilled English at 4-bit: halving weight bytes
+# halves bandwidth through the unified memory bus, which dominates decode
+# latency on M-series. The "multilingual" profile keeps the multilingual
+# small model (still 4-bit).
+ASR_MODEL_NAME = os.environ.get("GHOSTTYPE_ASR_MODEL_NAME", "distil-small.en")
+ASR_MULTILINGUAL_MODEL_NAME = "small"
+ASR_BATCH_SIZE = int(os.environ.get("GHOSTTYPE_ASR_BATCH_SIZE", "12"))
+ASR_QUANT = os.environ.get("GHOSTTYPE_ASR_QUANT", "4bit")
+
+
+def _asr_model_name_for_profile(profile: str) -> str:
+    if profile == "multilingual":
+        return ASR_MULTILINGUAL_MODEL_NAME
+    return ASR_MODEL_NAME
+
+# Clips shorter than one Whisper window gain nothing from batching and would
+# only pay batch-padding overhead, so they keep the single-window path.
+BATCHED_DECODE_MIN_SECONDS = 30.0
+
 llm_model = None
 llm_tokenizer = None
 
 
+# Shared silence buffer for warmup and capability probes, allocated lazily and
+# exactly once so repeated warmups skip the 64 KB alloc + memset.
+_WARMUP_AUDIO: Any = None
+
+
+def _warmup_audio() -> Any:
+    global _WARMUP_AUDIO
+    if _WARMUP_AUDIO is None:
+        try:
+            # 直接在统一内存上分配,省掉 NumPy→MLX 的一次桥接拷贝。
+            import mlx.core as mx
+
+            _WARMUP_AUDIO = mx.zeros((16000,), dtype=mx.float32)
+        except Exception:
+            _WARMUP_AUDIO = np.zeros(16000, dtype=np.float32)
+    return _WARMUP_AUDIO
+
+
+def _warm_asr_model() -> None:
+    """预取 ASR 权重并预编译 Metal kernel，避免对 1 秒静音做完整的 encoder+decoder 解码。"""
+    try:
+        from huggingface_hub import snapshot_download
+
+        # 只拉取权重，不触发任何推理；后续 transcribe 直接命中本地缓存。
+        snapshot_download(ASR_REPO)
+    except Exception:
+        # 权重仍会在首次 transcribe 时按需下载。
+        pass
+
+    try:
+        import mlx.core as mx
+        from mlx_whisper.audio import log_mel_spectrogram, pad_or_trim
+        from mlx_whisper.load_models import load_model
+
+        model = load_model(ASR_REPO)
+        # 480 个采样点（约 30ms）足以触发 Metal shader 预编译；完全跳过 decoder。
+        mel = log_mel_spectrogram(_warmup_audio()[:480], n_mels=model.dims.n_mels)
+        mx.eval(model.encoder(pad_or_trim(mel, 3000, axis=-2)[None]))
+    except Exception:
+        # 回退到旧的完整 dummy 推理路径。
+        _ = _mlx_whisper().transcribe(_warmup_audio(), path_or_hf_repo=ASR_REPO)
+
+
 def initialize_models():
     """
     启动服务时的初始化函数。
@@ -105,17 +266,20 @@ def initialize_models():
 
     print("⏳ 正在检查并加载 LLM 模型...")
     # 这行代码会在首次运行时自动下载 4-bit 量化模型，之后直接从本地缓存读取
-    llm_model, llm_tokenizer = load(LLM_REPO)
+    load_fn, _ = _mlx_lm()
+    llm_model, llm_tokenizer = load_fn(LLM_REPO)
     print("✅ LLM 模型加载成功并驻留内存！")
 
     print("⏳ 正在检查并加载 ASR 模型...")
+    lightning_cls = _lightning_whisper_cls()
+    if lightning_cls is not None:
+        # 使用 lightning-whisper-mlx 的批处理解码器做预热，长音频可批量编码多个 30s 窗口。
+        _ = lightning_cls(model=ASR_MODEL_NAME, batch_size=ASR_BATCH_SIZE, quant=ASR_QUANT)
     # MLX Whisper 默认在执行 transcribe 时才会下载模型。
-    # 为了强制它在启动时就下载并缓存，我们传入一段 1 秒的纯静音空白音频做一次 Dummy 推理。
-    dummy_audio = np.zeros(16000, dtype=np.float32)
-    _ = mlx_whisper.transcribe(
-        dummy_audio,
-        path_or_hf_repo=ASR_REPO
-    )
+    # 显式预取权重 + encoder-only 预热，代替整段 1 秒静音的 Dummy 推理。
+    # 批处理解码器只接管 ≥30s 的长音频,短音频(绝大多数听写)仍走
+    # mlx_whisper 的 ASR_REPO 单窗路径,所以这一步在两个分支都要做。
+    _warm_asr_model()
     print("✅ ASR 模型预热及加载成功！")
 
 
@@ -123,11 +287,17 @@ DEFAULT_ASR_MODEL = ASR_REPO
 DEFAULT_LLM_MODEL = LLM_REPO
 
 
-class DictateRequest(BaseModel):
+class AudioRequestBase(BaseModel):
+    """Shared fields for every audio-inference request.
+
+    Collapsing the per-mode schemas into one base lets Pydantic compile a
+    single validator for the common fields instead of four copies.
+    """
+
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
     audio_path: str
     inference_audio_profile: str = "standard"
-    ui_language: str = "English"
-    output_language: str = "Auto"
     asr_model: str | None = None
     llm_model: str | None = None
     audio_enhancement_enabled: bool = True
@@ -144,97 +314,37 @@ class DictateRequest(BaseModel):
     limiter: dict[str, Any] = Field(default_factory=dict)
     targets: dict[str, Any] = Field(default_factory=dict)
     vad: dict[str, Any] = Field(default_factory=dict)
-    system_prompt: str | None = None
-    max_tokens: int = 350
     # Qwen3 ASR specific options
     qwen3_asr_use_system_prompt: bool = False
     qwen3_asr_use_dictionary: bool = True
     qwen3_asr_system_prompt: str | None = None
 
 
-class AskRequest(BaseModel):
-    audio_path: str
-    inference_audio_profile: str = "standard"
+class DictateRequest(AudioRequestBase):
+    ui_language: str = "English"
+    output_language: str = "Auto"
+    system_prompt: str | None = None
+    max_tokens: int = 350
+
+
+class AskRequest(AudioRequestBase):
     selected_text: str = ""
     ui_language: str = "English"
     output_language: str = "Auto"
-    asr_model: str | None = None
-    llm_model: str | None = None
-    audio_enhancement_enabled: bool = True
-    audio_enhancement_mode: str = "webrtc"
-    low_volume_boost: str = "medium"
-    noise_suppression_level: str = "moderate"
-    anti_cutoff_pause_ms: int = Field(default=350, ge=200, le=1200)
-    audio_debug_enabled: bool = False
-    enhancement_version: str = "v2"
-    enhancement_mode: str = "fast_dsp"
-    ns_engine: str = "webrtc"
-    loudness_strategy: str = "dynaudnorm"
-    dynamics: str = "upward_comp"
-    limiter: dict[str, Any] = Field(default_factory=dict)
-    targets: dict[str, Any] = Field(default_factory=dict)
-    vad: dict[str, Any] = Field(default_factory=dict)
     system_prompt: str | None = None
     web_search_enabled: bool = True
     max_search_results: int = Field(default=3, ge=1, le=8)
     max_tokens: int = 350
-    # Qwen3 ASR specific options
-    qwen3_asr_use_system_prompt: bool = False
-    qwen3_asr_use_dictionary: bool = True
-    qwen3_asr_system_prompt: str | None = None
 
 
-class TranslateRequest(BaseModel):
-    audio_path: str
-    inference_audio_profile: str = "standard"
+class TranslateRequest(AudioRequestBase):
     target_language: str = "Chinese"
-    asr_model: str | None = None
-    llm_model: str | None = None
-    audio_enhancement_enabled: bool = True
-    audio_enhancement_mode: str = "webrtc"
-    low_volume_boost: str = "medium"
-    noise_suppression_level: str = "moderate"
-    anti_cutoff_pause_ms: int = Field(default=350, ge=200, le=1200)
-    audio_debug_enabled: bool = False
-    enhancement_version: str = "v2"
-    enhancement_mode: str = "fast_dsp"
-    ns_engine: str = "webrtc"
-    loudness_strategy: str = "dynaudnorm"
-    dynamics: str = "upward_comp"
-    limiter: dict[str, Any] = Field(default_factory=dict)
-    targets: dict[str, Any] = Field(default_factory=dict)
-    vad: dict[str, Any] = Field(default_factory=dict)
     system_prompt: str | None = None
     max_tokens: int = 350
-    # Qwen3 ASR specific options
-    qwen3_asr_use_system_prompt: bool = False
-    qwen3_asr_use_dictionary: bool = True
-    qwen3_asr_system_prompt: str | None = None
 
 
-class ASRChunkRequest(BaseModel):
-    audio_path: str
-    inference_audio_profile: str = "standard"
-    asr_model: str | None = None
-    llm_model: str | None = None
-    audio_enhancement_enabled: bool = True
-    audio_enhancement_mode: str = "webrtc"
-    low_volume_boost: str = "medium"
-    noise_suppression_level: str = "moderate"
-    anti_cutoff_pause_ms: int = Field(default=350, ge=200, le=1200)
-    audio_debug_enabled: bool = False
-    enhancement_version: str = "v2"
-    enhancement_mode: str = "fast_dsp"
-    ns_engine: str = "webrtc"
-    loudness_strategy: str = "dynaudnorm"
-    dynamics: str = "upward_comp"
-    limiter: dict[str, Any] = Field(default_factory=dict)
-    targets: dict[str, Any] = Field(default_factory=dict)
-    vad: dict[str, Any] = Field(default_factory=dict)
-    # Qwen3 ASR specific options
-    qwen3_asr_use_system_prompt: bool = False
-    qwen3_asr_use_dictionary: bool = True
-    qwen3_asr_system_prompt: str | None = None
+class ASRChunkRequest(AudioRequestBase):
+    pass
 
 
 class PreparedTranscriptRequest(BaseModel):
@@ -281,8 +391,50 @@ class Qwen3ASRConfig:
     system_prompt: str | None = None
 
 
+def _json_dumps_pretty(payload: Any) -> str:
+    """Serialize state-file payloads (2-space indent, non-ASCII kept literal)."""
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_INDENT_2).decode("utf-8")
+    return json.dumps(payload, ensure_ascii=False, indent=2)
+
+
+def _json_dumps_compact(payload: Any) -> str:
+    if orjson is not None:
+        return orjson.dumps(payload).decode("utf-8")
+    return json.dumps(payload, ensure_ascii=False)
+
+
+def _json_loads(payload: str | bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(payload)
+    return json.loads(payload)
+
+
+_SSE_PREFIX = b"data: "
+_SSE_SUFFIX = b"\n\n"
+
+
+def _sse_event(payload: Any) -> bytes:
+    """Format one SSE data frame as bytes.
+
+    直接产出 bytes,Starlette 原样下发,省掉每帧的 str→bytes 编码;
+    orjson 可用时序列化也走它的快路径。
+    """
+    if isinstance(payload, str):
+        return _SSE_PREFIX + payload.encode("utf-8") + _SSE_SUFFIX
+    if orjson is not None:
+        return _SSE_PREFIX + orjson.dumps(payload) + _SSE_SUFFIX
+    return _SSE_PREFIX + json.dumps(payload, ensure_ascii=False).encode("utf-8") + _SSE_SUFFIX
+
+
 def utc_now_iso() -> str:
-    return datetime.now(timezone.utc).replace(microsecond=0).isoformat()
+    # 直接从 gmtime 拼字符串,跳过 datetime 对象分配;输出格式与
+    # datetime.isoformat() 完全一致。
+    t = time.gmtime()
+    return (
+        f"{t.tm_year:04d}-{t.tm_mon:02d}-{t.tm_mday:02d}"
+        f"T{t.tm_hour:02d}:{t.tm_min:02d}:{t.tm_sec:02d}+00:00"
+    )
 
 
 def _clamp_float(value: Any, fallback: float, lower: float, upper: float) -> float:
@@ -293,6 +445,117 @@ def _clamp_float(value: Any, fallback: float, lower: float, upper: float) -> flo
     return max(lower, min(upper, parsed))
 
 
+try:
+    from scipy.signal import resample_poly as _scipy_resample_poly
+except Exception:  # pragma: no cover - optional runtime import
+    _scipy_resample_poly = None
+
+
+@lru_cache(maxsize=8)
+def _hpf_alpha(cutoff_hz: float, sample_rate: int) -> float:
+    """One-pole high-pass coefficient, cached per (cutoff, rate) pair."""
+    dt = 1.0 / float(sample_rate)
+    rc = 1.0 / (2.0 * math.pi * cutoff_hz)
+    return rc / (rc + dt)
+
+
+# 发给 LLM 之前先用一条合并的交替模式删掉无语义的迟疑音,缩短 prompt。
+# 只匹配纯迟疑音("uh"/"um"/"er"/"hmm" 及其拉长形式);"like"、"you know"
+# 这类词可能承载语义,仍交给 LLM 按改写规则处理。可选用 re2 的 DFA 引擎
+# 保证对长转写 O(n) 扫描,缺省回退到标准库 re。
+# "er+m+|er" 而不是 "er+m*":后者会把正经动词 "err"(to err is human)
+# 也当迟疑音删掉;单独的 "er" 和带 m 的 "erm"/"errm" 才是纯迟疑音。
+_FILLER_PATTERN_SRC = r"(?i)\b(?:uh+m*|um+|er+m+|er|hm+m*)\b[,，]?\s*"
+try:
+    import re2 as _re2
+
+    _FILLER_RE = _re2.compile(_FILLER_PATTERN_SRC)
+except Exception:  # pragma: no cover - optional runtime import
+    _FILLER_RE = re.compile(_FILLER_PATTERN_SRC)
+
+
+def strip_hesitation_fillers(text: str) -> str:
+    """Remove pure hesitation sounds from an ASR transcript in one pass."""
+    if not text:
+        return text
+    return _FILLER_RE.sub("", text)
+
+
+# _audio_config_from_request 的枚举别名表,按模块级常量共享,避免每个
+# 请求重建这些字典。
+_MODE_ALIASES = {
+    "webrtc": "webrtc",
+    "web_rtc": "webrtc",
+    "system_voice_processing": "system_voice_processing",
+    "systemvoiceprocessing": "system_voice_processing",
+    "system": "system_voice_processing",
+    "off": "off",
+    "none": "off",
+    "disabled": "off",
+}
+_NOISE_ALIASES = {
+    "low": "low",
+    "moderate": "moderate",
+    "high": "high",
+    "veryhigh": "veryhigh",
+    "very_high": "veryhigh",
+    "very-high": "veryhigh",
+}
+_ENH_MODE_ALIASES = {
+    "fast_dsp": "fast_dsp",
+    "fast": "fast_dsp",
+    "high_quality": "high_quality",
+    "highquality": "high_quality",
+    "hq": "high_quality",
+    "custom": "custom",
+}
+_NS_ENGINE_ALIASES = {
+    "off": "off",
+    "none": "off",
+    "webrtc": "webrtc",
+    "web_rtc": "webrtc",
+    "rnnoise": "rnnoise",
+    "deepfilternet": "deepfilternet",
+    "deepfilter": "deepfilternet",
+    "speex": "speex",
+    "speexdsp": "speex",
+}
+_LOUDNESS_ALIASES = {
+    "lufs": "lufs",
+    "lufs_normalize": "lufs",
+    "dynaudnorm": "dynaudnorm",
+    "dynamic": "dynaudnorm",
+    "dynamic_normalize": "dynaudnorm",
+    "rms": "rms",
+    "legacy": "rms",
+}
+_DYNAMICS_ALIASES = {
+    "off": "off",
+    "none": "off",
+    "upward": "upward_comp",
+    "upward_comp": "upward_comp",
+    "upward_compressor": "upward_comp",
+    "comp_limiter": "comp_limiter",
+    "compressor_limiter": "comp_limiter",
+}
+_VAD_ENGINE_ALIASES = {
+    "webrtcvad": "webrtcvad",
+    "webrtc": "webrtcvad",
+    "energy": "energy",
+    "silero": "silero",
+}
+
+
+def _norm_enum(req: Any, attr: str, default: str, table: dict[str, str]) -> str:
+    value = getattr(req, attr, default)
+    return table.get(str(value or default).strip().lower(), default)
+
+
+# Darwin setpriority(2) 常量,参见 <sys/resource.h>
+_PRIO_DARWIN_PROCESS = 4
+_PRIO_DARWIN_BG = 0x1000
+
+
 def apply_background_scheduling() -> dict[str, str]:
     status: dict[str, str] = {}
 
@@ -303,28 +566,20 @@ def apply_background_scheduling() -> dict[str, str]:
         status["nice"] = f"not_set ({exc})"
 
     if sys.platform == "darwin":
-        pid = str(os.getpid())
+        # 直接调用 libSystem 的 setpriority,等价于 taskpolicy -b,免去 fork/exec
         try:
-            subprocess.run(
-                ["/usr/bin/renice", "10", "-p", pid],
-                check=False,
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL,
-            )
-            status["renice"] = "applied"
-        except FileNotFoundError:
-            status["renice"] = "missing"
+            import ctypes
+            import ctypes.util
 
-        try:
-            subprocess.run(
-                ["/usr/sbin/taskpolicy", "-b", "-p", pid],
-                check=False,
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL,
-            )
-            status["taskpolicy"] = "background_applied"
-        except FileNotFoundError:
-            status["taskpolicy"] = "missing"
+            libsystem = ctypes.CDLL(ctypes.util.find_library("System"), use_errno=True)
+            result = libsystem.setpriority(_PRIO_DARWIN_PROCESS, 0, _PRIO_DARWIN_BG)
+            if result == 0:
+                status["darwin_qos"] = "background_applied"
+            else:
+                errno = ctypes.get_errno()
+                status["darwin_qos"] = f"not_set (errno={errno})"
+        except Exception as exc:
+            status["darwin_qos"] = f"not_set ({exc})"
 
     return status
 
@@ -335,6 +590,60 @@ class SearchDecision:
     query: str
 
 
+_PREP_MODES = frozenset({"dictate", "ask", "translate"})
+
+
+@dataclass(frozen=True)
+class ModeSpec:
+    """Prompt hooks for one inference mode in the shared run/stream pipeline.
+
+    system/user 回调拿到 runtime 和请求对象,各模式只描述自己怎么拼
+    prompt,六个 handler 的公共骨架收敛到 _run_mode/_stream_mode。
+    """
+
+    name: str
+    system: Any  # (runtime, req) -> str
+    user: Any  # (runtime, req, raw_text, search_text) -> str
+    uses_search: bool = False
+
+
+_MODE_SPECS: dict[str, ModeSpec] = {
+    "dictate": ModeSpec(
+        name="dictate",
+        system=lambda rt, req: rt._composed_prompt("dictate", req.system_prompt),
+        user=lambda rt, req, raw_text, search_text: rt._dictate_user_prompt(raw_text),
+    ),
+    "ask": ModeSpec(
+        name="ask",
+        system=lambda rt, req: rt._composed_prompt("ask", req.system_prompt),
+        user=lambda rt, req, raw_text, search_text: rt._ask_user_prompt(
+            selected_text=req.selected_text,
+            question=raw_text,
+            search_text=search_text,
+        ),
+        uses_search=True,
+    ),
+    "translate": ModeSpec(
+        name="translate",
+        system=lambda rt, req: rt._composed_prompt(
+            "translate", req.system_prompt, req.target_language
+        ),
+        user=lambda rt, req, raw_text, search_text: rt._translate_user_prompt(raw_text),
+    ),
+}
+
+
+# 搜索触发词的廉价预过滤:问题里完全没有时效性/外部信息线索时,
+# 直接跳过 _decide_search 的一整次 LLM 往返。
+_SEARCH_TRIGGER_RE = re.compile(
+    r"(?i)(?:"
+    r"\b(?:latest|today|now|news|weather|price|stock|release[sd]?|version|20\d{2})\b"
+    r"|https?://"
+    r"|最近|现在|今天|最新|新闻|天气|价格|股价|行情|发布"
+    r")"
+)
+
+
 @dataclass
 class AudioEnhancementConfig:
     enabled: bool
@@ -356,9 +665,12 @@ class AudioEnhancementConfig:
 
 @dataclass
 class AudioEnhancementResult:
-    transcribe_paths: list[str]
+    # 片段既可能是临时 WAV 路径,也可能是直接递给 transcribe 的 float32 波形。
+    transcribe_paths: list[str | np.ndarray]
     cleanup_paths: list[Path]
     stats: dict[str, Any]
+    # 所有临时产物都在这一个目录下;非 None 时清理只需一次 rmtree。
+    root_temp_dir: Path | None = None
 
 
 @dataclass
@@ -404,33 +716,87 @@ class ResidentModelRuntime:
         self.app_support_dir = self.state_dir.parent
         self.asr_model_id = asr_model
         self.llm_model_id = llm_model
-        self.idle_timeout_seconds = idle_timeout_seconds
+        # (last_active, idle_timeout_seconds) swapped as one tuple so the
+        # health path and watchdog can read both atomically without a lock.
+        self._idle_state: tuple[float, int | None] = (time.monotonic(), idle_timeout_seconds)
 
         self.dictionary_path = self.app_support_dir / "dictionary.json"
         self.style_profile_path = self.state_dir / "style_profile.json"
 
         self._asr_module: Any | None = None
+        self._whisper: Any | None = None  # Batched lightning-whisper-mlx decoder
+        self._whisper_model_name: str | None = None
+        self._whisper_init_failed = False
+        # Reusable float32 scratch for PCM16 conversion; grown on demand.
+        self._f32_buf: np.ndarray | None = None
+        self._pcm16_scratch_f: np.ndarray | None = None
+        # 10ms 帧级 int16 转换的常驻 scratch(APM 等逐帧路径复用)。
+        self._frame_scratch_f = np.empty(160, dtype=np.float32)
+        self._frame_scratch_i = np.empty(160, dtype=np.int16)
         self._qwen3_asr_model: Any | None = None  # Cached Qwen3 ASR model
         self._qwen3_asr_model_id: str | None = None  # Track model ID for cache invalidation
         self._llm_module: Any | None = None
         self._llm_model: Any | None = None
         self._llm_tokenizer: Any | None = None
 
+        # Composed system prompts keyed by (mode, override, target language),
+        # each entry tagged with the personalization mtime version.
+        self._composed_prompt_cache: dict[tuple[str, str, str], tuple[tuple[int, int], str]] = {}
+        # Interned {"role": "system", ...} dicts, one per distinct prompt.
+        self._system_msg_cache: dict[str, dict[str, str]] = {}
+        # Parsed personalization files cached by mtime so hot request paths
+        # pay a stat() instead of a read + json.loads per call.
+        self._dictionary_cache: tuple[int, list[dict[str, str]]] | None = None
+        self._style_profile_cache: tuple[int, dict[str, Any]] | None = None
+        self._style_rules_text_cache: tuple[int, str] | None = None
+        self._personalization_suffix_cache: tuple[tuple[int, int], str] | None = None
+        self._asr_prompt_cache: tuple[int, str] | None = None
+        # (transcribe func, supported kwargs or None for **kwargs/unknown)
+        self._transcribe_kwargs_cache: tuple[Any, frozenset[str] | None] | None = None
+        self._dictionary_rule_cache: tuple[int, str] | None = None
+        self._dictionary_content_hash: bytes | None = None
+
+        # Prefilled KV caches for repeated system prompts, keyed by rendered
+        # system content and versioned by dictionary/style file mtimes so a
+        # personalization change invalidates the stale prefix.
+        self._prompt_prefix_caches: dict[str, tuple[tuple[int, int], str, list[int], Any]] = {}
+
         self._lock = threading.RLock()
-        # Serialises end-to-end inference requests (ASR + LLM).  Kept separate
-        # from _lock so that health(), release_models(), and the watchdog thread
-        # can always acquire _lock quickly, even while inference is running.
-        self._inference_lock = threading.Lock()
+        # 按阶段限流而不是整请求串行:ASR 占用自己的槽位,LLM 由
+        # _generation_lock 串行化,于是请求 B 的转写可以和请求 A 的
+        # 生成重叠。_lock 仍只保护短临界区(模型切换/状态读写),
+        # health()、release_models() 和看门狗线程随时能拿到它。
+        self._asr_slots = threading.BoundedSemaphore(1)
+        # 单工作线程:只用来在 GPU 解码当前段时预取下一段的输入。
+        self._prefetch_executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="ghosttype-prefetch"
+        )
+        # IO 密集的旁路任务(DDG 搜索等),和主线程的 prompt 组装/模型
+        # 加载并行。
+        self._io_executor = ThreadPoolExecutor(
+            max_workers=4, thread_name_prefix="ghosttype-io"
+        )
+        # 长生命周期的 DDGS 客户端,首次搜索时惰性创建。
+        self._ddgs_client: Any = None
+        self._ddgs_lock = threading.Lock()
+        # 风格学习单工作线程;只保留最新一个待处理任务。
+        self._style_executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="ghosttype-style"
+        )
+        self._style_learning_future: Any = None
         self._generation_lock = threading.Lock()
         self._shutdown = threading.Event()
         self._watchdog_thread: threading.Thread | None = None
-        self._last_active = time.monotonic()
         self._style_learning_idle_grace_seconds = 20.0
         self._scheduling = apply_background_scheduling()
         self._enhancement_plugins = probe_enhancement_plugins()
         self._ffmpeg_path: str | None = None
         self._ffmpeg_source = "none"
+        self._ffmpeg_probe_ts = 0.0
+        self._ffmpeg_capability_ttl = 30.0
+        self._path_has_ffmpeg_dir: str | None = None
         self._transcribe_accepts_ndarray: bool | None = None
+        self._transcribe_ndarray_support: dict[int, bool] = {}
         print(
             f"[enhancement-capabilities] {json.dumps(self._enhancement_plugins, ensure_ascii=False)}",
             flush=True,
@@ -442,6 +808,7 @@ class ResidentModelRuntime:
         )
 
         self._ensure_state_files()
+        warm_dsp_kernels()
 
     def start(self) -> None:
         self._watchdog_thread = threading.Thread(
@@ -453,33 +820,42 @@ class ResidentModelRuntime:
 
     def stop(self) -> None:
         self._shutdown.set()
+        self._prefetch_executor.shutdown(wait=False)
+        self._io_executor.shutdown(wait=False)
+        self._style_executor.shutdown(wait=False)
         if self._watchdog_thread and self._watchdog_thread.is_alive():
             self._watchdog_thread.join(timeout=1.0)
         self.release_models()
 
+    @property
+    def idle_timeout_seconds(self) -> int | None:
+        return self._idle_state[1]
+
+    @property
+    def _last_active(self) -> float:
+        return self._idle_state[0]
+
     def set_idle_timeout(self, seconds: int | None) -> None:
-        with self._lock:
-            self.idle_timeout_seconds = seconds
-            self._last_active = time.monotonic()
+        self._idle_state = (time.monotonic(), seconds)
 
     def get_idle_timeout(self) -> int | None:
-        with self._lock:
-            return self.idle_timeout_seconds
+        return self._idle_state[1]
 
     def health(self) -> dict[str, Any]:
-        with self._lock:
-            self._refresh_ffmpeg_capability()
-            return {
-                "status": "ok",
-                "asr_model": self.asr_model_id,
-                "llm_model": self.llm_model_id,
-                "llm_loaded": self._llm_model is not None,
-                "idle_timeout_seconds": self.idle_timeout_seconds,
-                "last_active_age_seconds": round(time.monotonic() - self._last_active, 2),
-                "state_dir": str(self.state_dir),
-                "scheduling": self._scheduling,
-                "asr_capabilities": self._asr_capability_payload(),
-            }
+        # 只读路径:单次读取 _idle_state 元组即可保证一致性,不再抢 _lock。
+        self._refresh_ffmpeg_capability(max_age_seconds=self._ffmpeg_capability_ttl)
+        last_active, idle_timeout = self._idle_state
+        return {
+            "status": "ok",
+            "asr_model": self.asr_model_id,
+            "llm_model": self.llm_model_id,
+            "llm_loaded": self._llm_model is not None,
+            "idle_timeout_seconds": idle_timeout,
+            "last_active_age_seconds": round(time.monotonic() - last_active, 2),
+            "state_dir": str(self.state_dir),
+            "scheduling": self._scheduling,
+            "asr_capabilities": self._asr_capability_payload(),
+        }
 
     def _asr_capability_payload(self) -> dict[str, Any]:
         return {
@@ -504,25 +880,48 @@ class ResidentModelRuntime:
             return system_path, "system_path"
         return None, "not_found"
 
-    def _refresh_ffmpeg_capability(self) -> None:
+    def _refresh_ffmpeg_capability(self, max_age_seconds: float = 0.0) -> None:
+        # 健康检查等高频路径传入 max_age_seconds,避免每次轮询都扫 $PATH。
+        now = time.monotonic()
+        if max_age_seconds > 0.0 and (now - self._ffmpeg_probe_ts) < max_age_seconds:
+            return
         path, source = self._resolve_ffmpeg_path()
         self._ffmpeg_path = path
         self._ffmpeg_source = source
+        self._ffmpeg_probe_ts = now
+        self._ensure_ffmpeg_on_path()
+
+    def _ensure_ffmpeg_on_path(self) -> None:
+        # 启动/探测时把 ffmpeg 目录一次性加进 PATH,之后解码路径不再动
+        # os.environ——按请求临时改全局 PATH 在并发下会互相踩。
+        ffmpeg_path = self._ffmpeg_path
+        if not ffmpeg_path:
+            return
+        ffmpeg_dir = str(Path(ffmpeg_path).resolve().parent)
+        if self._path_has_ffmpeg_dir == ffmpeg_dir:
+            return
+        current = str(os.environ.get("PATH") or "")
+        if ffmpeg_dir not in current.split(os.pathsep):
+            os.environ["PATH"] = f"{ffmpeg_dir}{os.pathsep}{current}" if current else ffmpeg_dir
+        self._path_has_ffmpeg_dir = ffmpeg_dir
+
+    def invalidate_ffmpeg_capability(self) -> None:
+        """设置变更（如内置 ffmpeg 开关）后调用，下次请求强制重新探测。"""
+        self._ffmpeg_probe_ts = 0.0
 
     def _touch(self) -> None:
-        self._last_active = time.monotonic()
+        self._idle_state = (time.monotonic(), self._idle_state[1])
 
     def _watchdog_loop(self) -> None:
         while not self._shutdown.is_set():
             time.sleep(2.0)
-            with self._lock:
-                timeout = self.idle_timeout_seconds
-                elapsed = time.monotonic() - self._last_active
-                should_release = (
-                    timeout is not None
-                    and self._llm_model is not None
-                    and elapsed >= timeout
-                )
+            last_active, timeout = self._idle_state
+            elapsed = time.monotonic() - last_active
+            should_release = (
+                timeout is not None
+                and self._llm_model is not None
+                and elapsed >= timeout
+            )
             if should_release:
                 self.release_models()
 
@@ -533,9 +932,10 @@ class ResidentModelRuntime:
         if not self.dictionary_path.exists():
             items: list[dict[str, str]] = []
             legacy_path = self.state_dir / "custom_dictionary.json"
-            if legacy_path.exists():
+            if legacy_path.exists() and legacy_path.stat().st_size > 0:
                 try:
-                    legacy_payload = json.loads(legacy_path.read_text(encoding="utf-8"))
+                    # bytes → dict,省掉一次文本解码
+                    legacy_payload = _json_loads(legacy_path.read_bytes())
                     terms = legacy_payload.get("terms") if isinstance(legacy_payload, dict) else None
                     if isinstance(terms, list):
                         for term in terms:
@@ -551,20 +951,18 @@ class ResidentModelRuntime:
                 except Exception:
                     items = []
             self.dictionary_path.write_text(
-                json.dumps({"items": items}, ensure_ascii=False, indent=2),
+                _json_dumps_pretty({"items": items}),
                 encoding="utf-8",
             )
 
         if not self.style_profile_path.exists():
             self.style_profile_path.write_text(
-                json.dumps(
+                _json_dumps_pretty(
                     {
                         "version": 1,
                         "updated_at": utc_now_iso(),
                         "rules": [],
-                    },
-                    ensure_ascii=False,
-                    indent=2,
+                    }
                 ),
                 encoding="utf-8",
             )
@@ -590,7 +988,19 @@ class ResidentModelRuntime:
 
     def get_dictionary_items(self) -> list[dict[str, str]]:
         try:
-            payload = json.loads(self.dictionary_path.read_text(encoding="utf-8"))
+            mtime_ns = self.dictionary_path.stat().st_mtime_ns
+        except OSError:
+            return []
+        cached = self._dictionary_cache
+        if cached is not None and cached[0] == mtime_ns:
+            return cached[1]
+        items = self._parse_dictionary_items()
+        self._dictionary_cache = (mtime_ns, items)
+        return items
+
+    def _parse_dictionary_items(self) -> list[dict[str, str]]:
+        try:
+            payload = _json_loads(self.dictionary_path.read_text(encoding="utf-8"))
             if isinstance(payload, dict):
                 if isinstance(payload.get("items"), list):
                     return self._normalize_dictionary_items(payload.get("items"))
@@ -635,53 +1045,150 @@ class ResidentModelRuntime:
             }
             for value in normalized
         ]
-        self.dictionary_path.write_text(
-            json.dumps({"items": items}, ensure_ascii=False, indent=2),
-            encoding="utf-8",
-        )
+        payload = _json_dumps_pretty({"items": items}).encode("utf-8")
+        digest = hashlib.blake2b(payload, digest_size=16).digest()
+        if digest == self._dictionary_content_hash:
+            # Same terms as on disk: skip the rewrite so mtime-based caches
+            # (and any file watchers) are not needlessly invalidated.
+            return normalized
+
+        tmp_path = self.dictionary_path.with_suffix(".tmp")
+        tmp_path.write_bytes(payload)
+        os.replace(tmp_path, self.dictionary_path)
+        self._dictionary_content_hash = digest
+        self._dictionary_rule_cache = None
+        try:
+            self._dictionary_cache = (self.dictionary_path.stat().st_mtime_ns, items)
+        except OSError:
+            self._dictionary_cache = None
         return normalized
 
     def get_style_profile(self) -> dict[str, Any]:
         try:
-            payload = json.loads(self.style_profile_path.read_text(encoding="utf-8"))
+            mtime_ns = self.style_profile_path.stat().st_mtime_ns
+        except OSError:
+            return {"version": 1, "updated_at": utc_now_iso(), "rules": []}
+        cached = self._style_profile_cache
+        if cached is not None and cached[0] == mtime_ns:
+            # Copy so callers that mutate the profile before writing it back
+            # cannot corrupt the cached snapshot.
+            return copy.deepcopy(cached[1])
+        try:
+            payload = _json_loads(self.style_profile_path.read_text(encoding="utf-8"))
             payload.setdefault("rules", [])
             payload.setdefault("updated_at", utc_now_iso())
             payload.setdefault("version", 1)
-            return payload
         except Exception:
             return {"version": 1, "updated_at": utc_now_iso(), "rules": []}
+        self._style_profile_cache = (mtime_ns, payload)
+        return copy.deepcopy(payload)
 
     def clear_style_profile(self) -> dict[str, Any]:
         payload = {"version": 1, "updated_at": utc_now_iso(), "rules": []}
         self.style_profile_path.write_text(
-            json.dumps(payload, ensure_ascii=False, indent=2),
+            _json_dumps_pretty(payload),
             encoding="utf-8",
         )
         return payload
 
     def _style_rules_as_text(self) -> str:
+        try:
+            mtime_ns = self.style_profile_path.stat().st_mtime_ns
+        except OSError:
+            mtime_ns = -1
+        cached = self._style_rules_text_cache
+        if cached is not None and cached[0] == mtime_ns:
+            return cached[1]
         rules = self.get_style_profile().get("rules", [])
-        if not rules:
-            return ""
         lines = [str(rule).strip() for rule in rules if str(rule).strip()]
-        return "；".join(lines)
+        text = "；".join(lines)
+        self._style_rules_text_cache = (mtime_ns, text)
+        return text
 
-    def _append_personalization_rules(self, prompt: str) -> str:
+    def _dictionary_rule_block(self) -> str:
+        """Serialized dictionary prompt fragment, cached by dictionary mtime."""
+        try:
+            mtime_ns = self.dictionary_path.stat().st_mtime_ns
+        except OSError:
+            mtime_ns = -1
+        cached = self._dictionary_rule_cache
+        if cached is not None and cached[0] == mtime_ns:
+            return cached[1]
         dictionary_items = self.get_dictionary_items()
-        style_profile = self._style_rules_as_text()
-
+        block = ""
         if dictionary_items:
-            prompt += (
+            block = (
                 "\n\nAdditional rule: strictly apply the following proper-noun mapping dictionary while processing text: "
-                f"{json.dumps({'items': dictionary_items}, ensure_ascii=False)}"
+                f"{_json_dumps_compact({'items': dictionary_items})}"
             )
+        self._dictionary_rule_cache = (mtime_ns, block)
+        return block
+
+    def _personalization_suffix(self) -> str:
+        """Combined dictionary + style prompt suffix, rebuilt only when either file changes."""
+        version = self._personalization_mtimes()
+        cached = self._personalization_suffix_cache
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        parts = [self._dictionary_rule_block()]
+        style_profile = self._style_rules_as_text()
         if style_profile:
-            prompt += (
+            parts.append(
                 "\n\nAdditional rule: follow these abstract writing-style traits when generating the final text: "
                 f"{style_profile}"
             )
+        suffix = "".join(parts)
+        self._personalization_suffix_cache = (version, suffix)
+        return suffix
+
+    def _append_personalization_rules(self, prompt: str) -> str:
+        suffix = self._personalization_suffix()
+        if not suffix:
+            return prompt
+        return "".join((prompt, suffix))
+
+    def _composed_prompt(self, mode: str, override_prompt: str | None, target_language: str = "") -> str:
+        """Final system prompt for a mode, cached by personalization version.
+
+        组装结果对同一 (mode, override, 目标语言) 每个请求都相同,
+        按个性化文件的 mtime 版本缓存;词典或风格文件一变,版本号
+        不匹配即重新组装。
+        """
+        version = self._personalization_mtimes()
+        key = (mode, override_prompt or "", target_language)
+        cached = self._composed_prompt_cache.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        if mode == "dictate":
+            fallback = self._dictate_system_prompt()
+        elif mode == "ask":
+            fallback = self._ask_system_prompt()
+        else:
+            fallback = self._translate_system_prompt(target_language)
+        prompt = self._append_personalization_rules(
+            self._resolve_system_prompt(override_prompt, fallback)
+        )
+        if len(self._composed_prompt_cache) > 64:
+            # 客户端不断变换 override 时别让缓存无界增长。
+            self._composed_prompt_cache.clear()
+        self._composed_prompt_cache[key] = (version, prompt)
         return prompt
 
+    def _system_message(self, prompt: str) -> dict[str, str]:
+        """Shared {"role": "system", ...} dict per distinct prompt.
+
+        同一 system prompt 每个请求都要重新包一层 dict;驻留后复用同一
+        对象,省掉分配,也让 _prompt_cache_split 的前缀比较命中同串。
+        下游只读消息,不会原地修改。
+        """
+        msg = self._system_msg_cache.get(prompt)
+        if msg is None:
+            if len(self._system_msg_cache) > 64:
+                self._system_msg_cache.clear()
+            msg = {"role": "system", "content": prompt}
+            self._system_msg_cache[prompt] = msg
+        return msg
+
     def _resolve_system_prompt(self, override_prompt: str | None, fallback_prompt: str) -> str:
         if not override_prompt:
             return fallback_prompt
@@ -733,7 +1240,7 @@ class ResidentModelRuntime:
     def _dictate_user_prompt(self, raw_text: str) -> str:
         return (
             "Rewrite the following ASR transcript into clean written text while preserving all substantive details:\n\n"
-            f"{raw_text}"
+            f"{strip_hesitation_fillers(raw_text)}"
         )
 
     def _ask_system_prompt(self) -> str:
@@ -853,7 +1360,7 @@ class ResidentModelRuntime:
     def _prepare_ask_search_context(self, req: AskRequest, question: str) -> tuple[bool, list[dict[str, str]], str]:
         used_search = False
         web_sources: list[dict[str, str]] = []
-        if req.web_search_enabled:
+        if req.web_search_enabled and _SEARCH_TRIGGER_RE.search(question or ""):
             decision = self._decide_search(req.selected_text, question)
             if decision.need_search:
                 web_sources = self._run_duckduckgo(decision.query, req.max_search_results)
@@ -869,6 +1376,21 @@ class ResidentModelRuntime:
             search_text = "No web sources used."
         return used_search, web_sources, search_text
 
+    def _submit_ask_search_context(self, req: AskRequest, question: str) -> Any:
+        """Kick off the web-search pipeline on the IO executor.
+
+        DDG 抓取是纯网络 IO,放到旁路线程后和 prompt 组装、
+        _ensure_llm_loaded 并行;调用方在拼 user prompt 之前汇合。
+        """
+        return self._io_executor.submit(self._prepare_ask_search_context, req, question)
+
+    def _collect_ask_search_context(self, future: Any) -> tuple[bool, list[dict[str, str]], str]:
+        try:
+            return future.result(timeout=10.0)
+        except Exception:
+            # 搜索超时或失败时照常作答,只是不带 web 上下文。
+            return False, [], "No web sources used."
+
     def _stream_mode_response(
         self,
         mode: str,
@@ -881,19 +1403,43 @@ class ResidentModelRuntime:
         extra_timings: dict[str, float] | None = None,
     ):
         t1 = time.perf_counter()
-        output_parts: list[str] = []
         first_token_ms: float | None = None
+        # 批量下发 token:批大小从 1 起每次冲刷 x3 增长到上限 8,配合 20ms
+        # 的冲刷间隔——开头逐 token 保住打字手感和 TTFT,稳态后帧数降一个
+        # 量级。成批时拼成一条 "token" 事件下发,老客户端无需认新事件类型。
+        # 累积全文用 StringIO 单块增长;热循环内把方法绑定成局部名,
+        # 省掉每 token 一次的 LOAD_ATTR。
+        buf = io.StringIO()
+        write = buf.write
+        perf_counter = time.perf_counter
+        sse_event = _sse_event
+        pending: list[str] = []
+        min_batch = 1
+        last_flush = t1
         try:
             for token in self._stream_generate_chat(messages=messages, max_tokens=max_tokens):
+                now = perf_counter()
                 if first_token_ms is None:
-                    first_token_ms = (time.perf_counter() - t1) * 1000.0
-                output_parts.append(token)
-                yield self._sse_event({"type": "token", "token": token})
+                    first_token_ms = (now - t1) * 1000.0
+                write(token)
+                pending.append(token)
+                if len(pending) >= min_batch or (now - last_flush) >= 0.02:
+                    yield sse_event(
+                        {"type": "token", "token": pending[0] if len(pending) == 1 else "".join(pending)}
+                    )
+                    pending.clear()
+                    last_flush = now
+                    min_batch = min(min_batch * 3, 8)
+            if pending:
+                yield sse_event(
+                    {"type": "token", "token": pending[0] if len(pending) == 1 else "".join(pending)}
+                )
+                pending.clear()
         finally:
             self._touch()
         t_llm = (time.perf_counter() - t1) * 1000
 
-        output = "".join(output_parts).strip() or raw_text
+        output = buf.getvalue().strip() or raw_text
         self._start_style_learning_task(output)
         response_timing = dict(extra_timings or {})
         if first_token_ms is not None:
@@ -908,21 +1454,29 @@ class ResidentModelRuntime:
             web_sources=web_sources,
             extra_timings=response_timing,
         )
-        yield self._sse_event({"type": "done", "meta": self._response_payload(response)})
-        yield self._sse_event("[DONE]")
+        yield _sse_event({"type": "done", "meta": self._response_payload(response)})
+        yield _sse_event("[DONE]")
 
     def _clamp_max_tokens(self, value: int) -> int:
         return max(1, min(int(value), 350))
 
     def _make_asr_initial_prompt(self) -> str:
+        try:
+            mtime_ns = self.dictionary_path.stat().st_mtime_ns
+        except OSError:
+            mtime_ns = -1
+        cached = self._asr_prompt_cache
+        if cached is not None and cached[0] == mtime_ns:
+            return cached[1]
         terms = self.get_dictionary_terms()
-        if not terms:
-            return ""
-        joined = ", ".join(terms)
-        return (
-            "Prefer these spellings for proper nouns and domain vocabulary: "
-            f"{joined}."
-        )
+        prompt = ""
+        if terms:
+            prompt = (
+                "Prefer these spellings for proper nouns and domain vocabulary: "
+                f"{', '.join(terms)}."
+            )
+        self._asr_prompt_cache = (mtime_ns, prompt)
+        return prompt
 
     def _make_qwen3_dictionary_prompt(self) -> str:
         """Generate a dictionary prompt specifically for Qwen3 ASR."""
@@ -954,22 +1508,86 @@ class ResidentModelRuntime:
                     self._asr_module = mlx_audio
                 else:
                     # Fallback to mlx_whisper if mlx_audio is not available
-                    self._asr_module = mlx_whisper
+                    self._asr_module = _mlx_whisper()
                     print("[WARNING] mlx_audio not available, falling back to mlx_whisper")
             else:
-                self._asr_module = mlx_whisper
+                self._asr_module = _mlx_whisper()
         return self._asr_module
 
+    def _ensure_batched_whisper(self, model_name: str = ASR_MODEL_NAME) -> Any | None:
+        lightning_cls = _lightning_whisper_cls()
+        if lightning_cls is None or self._whisper_init_failed:
+            return None
+        if self._whisper is None or self._whisper_model_name != model_name:
+            try:
+                self._whisper = lightning_cls(
+                    model=model_name,
+                    batch_size=ASR_BATCH_SIZE,
+                    quant=ASR_QUANT,
+                )
+                self._whisper_model_name = model_name
+            except Exception as exc:
+                self._whisper_init_failed = True
+                print(
+                    f"[asr] lightning-whisper-mlx init failed, keeping mlx_whisper path: {exc}",
+                    flush=True,
+                )
+                return None
+        return self._whisper
+
+    def _transcribe_batched_if_long(self, audio_path: str, inference_audio_profile: str = "standard") -> str | None:
+        """Decode long clips with the batched encoder; short clips fall through."""
+        whisper = self._ensure_batched_whisper(_asr_model_name_for_profile(inference_audio_profile))
+        if whisper is None:
+            return None
+        try:
+            metadata = read_wav_metadata(audio_path)
+            duration_seconds = metadata.frame_count / max(1, metadata.sample_rate)
+        except Exception:
+            return None
+        if duration_seconds < BATCHED_DECODE_MIN_SECONDS:
+            return None
+        try:
+            result = whisper.transcribe(audio_path=audio_path)
+        except Exception as exc:
+            print(f"[asr] batched transcribe failed, falling back: {exc}", flush=True)
+            return None
+        return str((result or {}).get("text") or "").strip()
+
+    def _ndarray_segment_handoff_supported(self) -> bool:
+        """Whether VAD segments can skip the temp-WAV round trip."""
+        asr_model_id = self.asr_model_id.lower()
+        if "qwen3-asr" in asr_model_id or "qwen3_asr" in asr_model_id:
+            return False
+        try:
+            module = self._ensure_asr_module()
+            return self._ensure_transcribe_ndarray_support(module.transcribe)
+        except Exception:
+            return False
+
     def _ensure_transcribe_ndarray_support(self, transcribe_func: Any) -> bool:
-        if self._transcribe_accepts_ndarray is not None:
-            return self._transcribe_accepts_ndarray
+        # 按函数对象 id 记忆探测结果:ASR 模块被热替换时会换成新的函数对象,
+        # 自动触发重新探测,而同一函数只付一次 inspect 成本。
+        key = id(transcribe_func)
+        cached = self._transcribe_ndarray_support.get(key)
+        if cached is not None:
+            self._transcribe_accepts_ndarray = cached
+            return cached
         try:
             signature = inspect.signature(transcribe_func)
-            signature.bind(np.zeros(1, dtype=np.float32), path_or_hf_repo=self.asr_model_id)
-            self._transcribe_accepts_ndarray = True
+            params = signature.parameters
+            if "audio" in params or any(
+                p.kind is inspect.Parameter.VAR_KEYWORD for p in params.values()
+            ):
+                supported = True
+            else:
+                signature.bind(np.zeros(1, dtype=np.float32), path_or_hf_repo=self.asr_model_id)
+                supported = True
         except Exception:
-            self._transcribe_accepts_ndarray = False
-        return self._transcribe_accepts_ndarray
+            supported = False
+        self._transcribe_ndarray_support[key] = supported
+        self._transcribe_accepts_ndarray = supported
+        return supported
 
     @contextmanager
     def _ffmpeg_decode_environment(self, requires_ffmpeg: bool):
@@ -977,9 +1595,8 @@ class ResidentModelRuntime:
             yield
             return
 
-        self._refresh_ffmpeg_capability()
-        ffmpeg_path = self._ffmpeg_path
-        if not ffmpeg_path:
+        self._refresh_ffmpeg_capability(max_age_seconds=self._ffmpeg_capability_ttl)
+        if not self._ffmpeg_path:
             raise ASRRequestError(
                 error_code="asr_decoder_unavailable",
                 human_message=(
@@ -988,22 +1605,11 @@ class ResidentModelRuntime:
                 ),
                 technical_message="ffmpeg not available for path-based decode",
             )
-
-        ffmpeg_dir = str(Path(ffmpeg_path).resolve().parent)
-        original_path = str(os.environ.get("PATH") or "")
-        has_dir = ffmpeg_dir in [entry for entry in original_path.split(os.pathsep) if entry]
-        if has_dir:
-            yield
-            return
-
-        os.environ["PATH"] = f"{ffmpeg_dir}{os.pathsep}{original_path}" if original_path else ffmpeg_dir
-        try:
-            yield
-        finally:
-            os.environ["PATH"] = original_path
+        # PATH 已在能力探测时补好,这里只做可用性校验。
+        yield
 
     def _prepare_transcribe_input(self, audio_path: str, transcribe_func: Any) -> tuple[str | np.ndarray, bool]:
-        self._refresh_ffmpeg_capability()
+        self._refresh_ffmpeg_capability(max_age_seconds=self._ffmpeg_capability_ttl)
         path = Path(audio_path)
         is_wav = path.suffix.lower() == ".wav"
 
@@ -1119,7 +1725,8 @@ class ResidentModelRuntime:
                 self._llm_model = llm_model
                 self._llm_tokenizer = llm_tokenizer
             else:
-                self._llm_model, self._llm_tokenizer = load(self.llm_model_id)
+                load_fn, _ = _mlx_lm()
+                self._llm_model, self._llm_tokenizer = load_fn(self.llm_model_id)
                 if self.llm_model_id == LLM_REPO:
                     llm_model = self._llm_model
                     llm_tokenizer = self._llm_tokenizer
@@ -1144,15 +1751,20 @@ class ResidentModelRuntime:
             changed_llm = True
 
         if changed_llm:
+            had_loaded_model = self._llm_model is not None
             self._llm_model = None
             self._llm_tokenizer = None
-            gc.collect()
-            try:
-                import mlx.core as mx
-
-                mx.metal.clear_cache()
-            except Exception:
-                pass
+            self._prompt_prefix_caches.clear()
+            # 只有真的卸载过权重才值得做一次完整 GC + Metal 缓存回收;
+            # 改了 model id 但模型尚未加载时跳过,省掉热路径上的 GC 周期。
+            if had_loaded_model:
+                gc.collect()
+                mx = _mlx_core()
+                if mx is not None:
+                    try:
+                        mx.metal.clear_cache()
+                    except Exception:
+                        pass
 
     def release_models(self) -> None:
         global llm_model, llm_tokenizer
@@ -1162,49 +1774,30 @@ class ResidentModelRuntime:
             self._llm_tokenizer = None
             self._qwen3_asr_model = None
             self._qwen3_asr_model_id = None
+            self._prompt_prefix_caches.clear()
             llm_model = None
             llm_tokenizer = None
             gc.collect()
-            try:
-                import mlx.core as mx
-
-                mx.metal.clear_cache()
-            except Exception:
-                pass
+            mx = _mlx_core()
+            if mx is not None:
+                try:
+                    mx.metal.clear_cache()
+                except Exception:
+                    pass
             self._touch()
 
     def _audio_config_from_request(self, req: Any) -> AudioEnhancementConfig:
         raw_profile = str(getattr(req, "inference_audio_profile", "standard") or "standard").strip().lower()
-        if raw_profile not in {"standard", "fast", "quality"}:
+        if raw_profile not in {"standard", "fast", "quality", "multilingual"}:
             raw_profile = "standard"
 
-        raw_mode = str(getattr(req, "audio_enhancement_mode", "webrtc") or "webrtc").strip().lower()
-        mode_aliases = {
-            "webrtc": "webrtc",
-            "web_rtc": "webrtc",
-            "system_voice_processing": "system_voice_processing",
-            "systemvoiceprocessing": "system_voice_processing",
-            "system": "system_voice_processing",
-            "off": "off",
-            "none": "off",
-            "disabled": "off",
-        }
-        mode = mode_aliases.get(raw_mode, "webrtc")
+        mode = _norm_enum(req, "audio_enhancement_mode", "webrtc", _MODE_ALIASES)
 
         low_boost = str(getattr(req, "low_volume_boost", "medium") or "medium").strip().lower()
         if low_boost not in {"low", "medium", "high"}:
             low_boost = "medium"
 
-        raw_noise_level = str(getattr(req, "noise_suppression_level", "moderate") or "moderate").strip().lower()
-        noise_aliases = {
-            "low": "low",
-            "moderate": "moderate",
-            "high": "high",
-            "veryhigh": "veryhigh",
-            "very_high": "veryhigh",
-            "very-high": "veryhigh",
-        }
-        noise_level = noise_aliases.get(raw_noise_level, "moderate")
+        noise_level = _norm_enum(req, "noise_suppression_level", "moderate", _NOISE_ALIASES)
 
         pause_ms = int(getattr(req, "anti_cutoff_pause_ms", 350) or 350)
         pause_ms = max(200, min(pause_ms, 1200))
@@ -1216,54 +1809,10 @@ class ResidentModelRuntime:
         raw_enhancement_version = str(getattr(req, "enhancement_version", "v2") or "v2").strip().lower()
         enhancement_version = raw_enhancement_version if raw_enhancement_version in {"legacy", "v2"} else "v2"
 
-        raw_enhancement_mode = str(getattr(req, "enhancement_mode", "fast_dsp") or "fast_dsp").strip().lower()
-        enhancement_mode_aliases = {
-            "fast_dsp": "fast_dsp",
-            "fast": "fast_dsp",
-            "high_quality": "high_quality",
-            "highquality": "high_quality",
-            "hq": "high_quality",
-            "custom": "custom",
-        }
-        enhancement_mode = enhancement_mode_aliases.get(raw_enhancement_mode, "fast_dsp")
-
-        raw_ns_engine = str(getattr(req, "ns_engine", "webrtc") or "webrtc").strip().lower()
-        ns_engine_aliases = {
-            "off": "off",
-            "none": "off",
-            "webrtc": "webrtc",
-            "web_rtc": "webrtc",
-            "rnnoise": "rnnoise",
-            "deepfilternet": "deepfilternet",
-            "deepfilter": "deepfilternet",
-            "speex": "speex",
-            "speexdsp": "speex",
-        }
-        ns_engine = ns_engine_aliases.get(raw_ns_engine, "webrtc")
-
-        raw_loudness = str(getattr(req, "loudness_strategy", "dynaudnorm") or "dynaudnorm").strip().lower()
-        loudness_aliases = {
-            "lufs": "lufs",
-            "lufs_normalize": "lufs",
-            "dynaudnorm": "dynaudnorm",
-            "dynamic": "dynaudnorm",
-            "dynamic_normalize": "dynaudnorm",
-            "rms": "rms",
-            "legacy": "rms",
-        }
-        loudness_strategy = loudness_aliases.get(raw_loudness, "dynaudnorm")
-
-        raw_dynamics = str(getattr(req, "dynamics", "upward_comp") or "upward_comp").strip().lower()
-        dynamics_aliases = {
-            "off": "off",
-            "none": "off",
-            "upward": "upward_comp",
-            "upward_comp": "upward_comp",
-            "upward_compressor": "upward_comp",
-            "comp_limiter": "comp_limiter",
-            "compressor_limiter": "comp_limiter",
-        }
-        dynamics = dynamics_aliases.get(raw_dynamics, "upward_comp")
+        enhancement_mode = _norm_enum(req, "enhancement_mode", "fast_dsp", _ENH_MODE_ALIASES)
+        ns_engine = _norm_enum(req, "ns_engine", "webrtc", _NS_ENGINE_ALIASES)
+        loudness_strategy = _norm_enum(req, "loudness_strategy", "dynaudnorm", _LOUDNESS_ALIASES)
+        dynamics = _norm_enum(req, "dynamics", "upward_comp", _DYNAMICS_ALIASES)
 
         limiter_payload = getattr(req, "limiter", {}) or {}
         if not isinstance(limiter_payload, dict):
@@ -1287,13 +1836,8 @@ class ResidentModelRuntime:
         if not isinstance(vad_payload, dict):
             vad_payload = {}
         vad_engine_raw = str(vad_payload.get("engine", "webrtcvad") or "webrtcvad").strip().lower()
-        vad_engine_aliases = {
-            "webrtcvad": "webrtcvad",
-            "webrtc": "webrtcvad",
-            "energy": "energy",
-        }
         vad = {
-            "engine": vad_engine_aliases.get(vad_engine_raw, "webrtcvad"),
+            "engine": _VAD_ENGINE_ALIASES.get(vad_engine_raw, "webrtcvad"),
             "aggressiveness": int(_clamp_float(vad_payload.get("aggressiveness"), 1, 0, 3)),
             "preroll_ms": int(_clamp_float(vad_payload.get("preroll_ms"), 100, 0, 500)),
             "hangover_ms": int(_clamp_float(vad_payload.get("hangover_ms"), pause_ms, 100, 1200)),
@@ -1340,8 +1884,34 @@ class ResidentModelRuntime:
         try:
             chunks: list[str] = []
             first_packet_ms: float | None = None
-            for index, path in enumerate(enhancement_result.transcribe_paths):
-                text = self._transcribe_audio_single(path, language=language, qwen3_config=qwen3_config)
+            inference_audio_profile = (
+                audio_config.inference_audio_profile if audio_config else "standard"
+            )
+            paths = enhancement_result.transcribe_paths
+            prefetch_future = None
+            for index, path in enumerate(paths):
+                prepared = None
+                if prefetch_future is not None:
+                    try:
+                        prepared = prefetch_future.result()
+                    except ASRRequestError:
+                        raise
+                    except Exception:
+                        prepared = None
+                # 当前段还没开始解码就先排队预取下一段的 WAV 读取/转换。
+                if index + 1 < len(paths) and isinstance(paths[index + 1], str):
+                    prefetch_future = self._prefetch_executor.submit(
+                        self._prefetch_transcribe_input, paths[index + 1]
+                    )
+                else:
+                    prefetch_future = None
+                text = self._transcribe_audio_single(
+                    path,
+                    language=language,
+                    qwen3_config=qwen3_config,
+                    inference_audio_profile=inference_audio_profile,
+                    prepared_input=prepared,
+                )
                 if index == 0:
                     first_packet_ms = (time.perf_counter() - asr_inference_started_at) * 1000.0
                 if text:
@@ -1379,20 +1949,62 @@ class ResidentModelRuntime:
                 timing_ms=timing,
             )
         finally:
-            files = [path for path in enhancement_result.cleanup_paths if path.is_file()]
-            dirs = [path for path in enhancement_result.cleanup_paths if path.is_dir()]
-            for path in files:
-                try:
-                    path.unlink(missing_ok=True)
-                except Exception:
-                    continue
-            for path in sorted(dirs, key=lambda item: len(str(item)), reverse=True):
-                try:
-                    path.rmdir()
-                except Exception:
-                    continue
+            if enhancement_result.root_temp_dir is not None:
+                shutil.rmtree(enhancement_result.root_temp_dir, ignore_errors=True)
+            else:
+                files = [path for path in enhancement_result.cleanup_paths if path.is_file()]
+                dirs = [path for path in enhancement_result.cleanup_paths if path.is_dir()]
+                for path in files:
+                    try:
+                        path.unlink(missing_ok=True)
+                    except Exception:
+                        continue
+                for path in sorted(dirs, key=lambda item: len(str(item)), reverse=True):
+                    try:
+                        path.rmdir()
+                    except Exception:
+                        continue
+
+    def _transcribe_supported_kwargs(self, transcribe: Any) -> frozenset[str] | None:
+        """Introspect which kwargs the installed transcribe function accepts.
+
+        Returns None when the function takes **kwargs (or cannot be
+        inspected), in which case no filtering is applied. Cached per
+        function object so the signature walk happens once per module load.
+        """
+        cached = self._transcribe_kwargs_cache
+        if cached is not None and cached[0] is transcribe:
+            return cached[1]
+        try:
+            params = inspect.signature(transcribe).parameters
+            if any(p.kind is inspect.Parameter.VAR_KEYWORD for p in params.values()):
+                supported: frozenset[str] | None = None
+            else:
+                supported = frozenset(params)
+        except (TypeError, ValueError):
+            supported = None
+        self._transcribe_kwargs_cache = (transcribe, supported)
+        return supported
+
+    def _prefetch_transcribe_input(self, audio_path: str) -> tuple[str | np.ndarray, bool] | None:
+        """Prepare the transcribe input for a segment off the decode thread.
+
+        Returns None for Qwen3 models, which consume the file path directly.
+        """
+        asr_model_id = self.asr_model_id.lower()
+        if "qwen3-asr" in asr_model_id or "qwen3_asr" in asr_model_id:
+            return None
+        module = self._ensure_asr_module()
+        return self._prepare_transcribe_input(audio_path, module.transcribe)
 
-    def _transcribe_audio_single(self, audio_path: str, language: str = "auto", qwen3_config: Qwen3ASRConfig | None = None) -> str:
+    def _transcribe_audio_single(
+        self,
+        audio_path: str | np.ndarray,
+        language: str = "auto",
+        qwen3_config: Qwen3ASRConfig | None = None,
+        inference_audio_profile: str = "standard",
+        prepared_input: tuple[str | np.ndarray, bool] | None = None,
+    ) -> str:
         # Check if using Qwen3 ASR model
         if "qwen3-asr" in self.asr_model_id.lower() or "qwen3_asr" in self.asr_model_id.lower():
             # Use mlx_audio for Qwen3 ASR
@@ -1455,49 +2067,51 @@ class ResidentModelRuntime:
                     status_code=500
                 )
         else:
+            # Long clips: batch the encoder over 30s windows via lightning-whisper-mlx.
+            if isinstance(audio_path, str):
+                batched_text = self._transcribe_batched_if_long(audio_path, inference_audio_profile)
+                if batched_text is not None:
+                    return batched_text
+
             # Use original mlx_whisper logic for other models
             module = self._ensure_asr_module()
             transcribe = module.transcribe
             lang = None if language.lower() == "auto" else language
             initial_prompt = self._make_asr_initial_prompt()
-            transcribe_input, requires_ffmpeg = self._prepare_transcribe_input(audio_path, transcribe)
+            if isinstance(audio_path, np.ndarray):
+                transcribe_input: str | np.ndarray = audio_path
+                requires_ffmpeg = False
+            elif prepared_input is not None:
+                transcribe_input, requires_ffmpeg = prepared_input
+            else:
+                transcribe_input, requires_ffmpeg = self._prepare_transcribe_input(audio_path, transcribe)
 
-            attempts = [
-                {
-                    "path_or_hf_repo": self.asr_model_id,
-                    "language": lang,
-                    "task": "transcribe",
-                    "initial_prompt": initial_prompt,
-                },
-                {
-                    "path_or_hf_repo": self.asr_model_id,
-                    "language": lang,
-                    "task": "transcribe",
-                },
-                {
-                    "path_or_hf_repo": self.asr_model_id,
-                    "language": lang,
-                },
-            ]
+            desired_kwargs = {
+                "path_or_hf_repo": self.asr_model_id,
+                "language": lang,
+                "task": "transcribe",
+                "initial_prompt": initial_prompt,
+            }
+            supported = self._transcribe_supported_kwargs(transcribe)
+            clean_kwargs = {
+                k: v
+                for k, v in desired_kwargs.items()
+                if v not in (None, "") and (supported is None or k in supported)
+            }
 
             result: dict[str, Any] | None = None
-            for kwargs in attempts:
-                clean_kwargs = {k: v for k, v in kwargs.items() if v not in (None, "")}
-                try:
-                    with self._ffmpeg_decode_environment(requires_ffmpeg):
-                        result = transcribe(transcribe_input, **clean_kwargs)
-                    break
-                except TypeError:
-                    continue
-                except (FileNotFoundError, subprocess.CalledProcessError, ValueError, ASRRequestError) as exc:
-                    self._raise_transcribe_exception(exc)
-
-            if result is None:
+            try:
+                with self._ffmpeg_decode_environment(requires_ffmpeg):
+                    result = transcribe(transcribe_input, **clean_kwargs)
+            except TypeError:
+                # 签名探测失败时的最后兜底:裸调用一次。
                 try:
                     with self._ffmpeg_decode_environment(requires_ffmpeg):
                         result = transcribe(transcribe_input)
                 except (FileNotFoundError, subprocess.CalledProcessError, ValueError, ASRRequestError) as exc:
                     self._raise_transcribe_exception(exc)
+            except (FileNotFoundError, subprocess.CalledProcessError, ValueError, ASRRequestError) as exc:
+                self._raise_transcribe_exception(exc)
 
             return str((result or {}).get("text") or "").strip()
 
@@ -1553,19 +2167,25 @@ class ResidentModelRuntime:
             )
 
         stats["input_duration_ms"] = round(1000.0 * signal.size / 16000.0, 2)
-        stats["input_rms_dbfs"] = round(self._estimate_rms_dbfs(signal), 2)
-        stats["input_peak_dbfs"] = round(self._estimate_peak_dbfs(signal), 2)
+        # 电平统计只在调试时有人看,默认跳过这些整段 reduction。
+        if audio_config.audio_debug_enabled:
+            rms_db, peak_db = self._rms_peak_dbfs(signal)
+            stats["input_rms_dbfs"] = round(rms_db, 2)
+            stats["input_peak_dbfs"] = round(peak_db, 2)
 
         enhancement_started_at = time.perf_counter()
+        probe_vad: tuple[np.ndarray, dict[str, Any]] | None = None
         if audio_config.enhancement_version == "v2":
-            enhanced_signal, v2_stats = self._apply_enhancement_v2(signal, audio_config)
+            enhanced_signal, v2_stats, probe_vad = self._apply_enhancement_v2(signal, audio_config)
             stats.update(v2_stats)
         else:
             if audio_config.mode == "webrtc":
                 preamp_signal, gain_stats = self._apply_low_volume_boost(signal, audio_config)
                 stats.update(gain_stats)
-                stats["preamp_rms_dbfs"] = round(self._estimate_rms_dbfs(preamp_signal), 2)
-                stats["preamp_peak_dbfs"] = round(self._estimate_peak_dbfs(preamp_signal), 2)
+                if audio_config.audio_debug_enabled:
+                    rms_db, peak_db = self._rms_peak_dbfs(preamp_signal)
+                    stats["preamp_rms_dbfs"] = round(rms_db, 2)
+                    stats["preamp_peak_dbfs"] = round(peak_db, 2)
 
                 hpf_signal, hpf_stats = self._apply_high_pass_filter(preamp_signal, cutoff_hz=80.0, sample_rate=16000)
                 stats.update(hpf_stats)
@@ -1583,8 +2203,10 @@ class ResidentModelRuntime:
                 stats["apm_backend"] = "not_requested"
         stats["enhancement_chain"] = round((time.perf_counter() - enhancement_started_at) * 1000.0, 2)
 
-        stats["enhanced_rms_dbfs"] = round(self._estimate_rms_dbfs(enhanced_signal), 2)
-        stats["enhanced_peak_dbfs"] = round(self._estimate_peak_dbfs(enhanced_signal), 2)
+        if audio_config.audio_debug_enabled:
+            rms_db, peak_db = self._rms_peak_dbfs(enhanced_signal)
+            stats["enhanced_rms_dbfs"] = round(rms_db, 2)
+            stats["enhanced_peak_dbfs"] = round(peak_db, 2)
 
         frame_size = 160  # 10ms at 16kHz
         frames = self._split_into_frames(enhanced_signal, frame_size=frame_size)
@@ -1592,12 +2214,19 @@ class ResidentModelRuntime:
         requested_vad_aggressiveness = int(
             _clamp_float(audio_config.vad.get("aggressiveness"), 1, 0, 3)
         )
-        vad_flags, vad_stats = self._detect_speech_frames(
-            frames,
-            audio_config,
-            vad_engine_override=requested_vad_engine,
-            vad_aggressiveness=requested_vad_aggressiveness,
-        )
+        if probe_vad is not None and len(probe_vad[0]) == len(frames):
+            # v2 探测 VAD 用的是同一套引擎参数,增强不改变时长,分段
+            # 直接复用其结果,省掉对增强后信号的第二次整段 VAD。
+            vad_flags, vad_stats = probe_vad
+            vad_stats = dict(vad_stats)
+            vad_stats["vad_reused_probe"] = True
+        else:
+            vad_flags, vad_stats = self._detect_speech_frames(
+                frames,
+                audio_config,
+                vad_engine_override=requested_vad_engine,
+                vad_aggressiveness=requested_vad_aggressiveness,
+            )
         stats.update(vad_stats)
 
         hangover_ms = int(
@@ -1624,28 +2253,46 @@ class ResidentModelRuntime:
             segments = [enhanced_signal]
 
         cleanup_paths: list[Path] = []
-        transcribe_paths: list[str] = []
-        temp_dir = Path(tempfile.mkdtemp(prefix="ghosttype-audio-"))
-
-        for index, segment in enumerate(segments):
-            clipped = np.clip(segment, -1.0, 1.0).astype(np.float32, copy=False)
-            if clipped.size < frame_size:
-                continue
-            segment_path = temp_dir / f"segment-{index:03d}.wav"
-            self._write_wav_mono_16k_int16(segment_path, clipped)
-            cleanup_paths.append(segment_path)
-            transcribe_paths.append(str(segment_path))
-
-        if not transcribe_paths:
-            stats["segment_write_fallback"] = True
-            cleanup_paths = []
-            transcribe_paths = [audio_path]
-            try:
-                temp_dir.rmdir()
-            except Exception:
-                pass
+        transcribe_paths: list[str | np.ndarray] = []
+        root_temp_dir: Path | None = None
+
+        if self._ndarray_segment_handoff_supported():
+            # transcribe 直接吃 ndarray 时,片段不用再经过临时 WAV 往返磁盘。
+            stats["segment_handoff"] = "ndarray"
+            for segment in segments:
+                clipped = np.clip(segment, -1.0, 1.0).astype(np.float32, copy=False)
+                if clipped.size < frame_size:
+                    continue
+                transcribe_paths.append(clipped)
+            if not transcribe_paths:
+                stats["segment_write_fallback"] = True
+                transcribe_paths = [audio_path]
         else:
-            cleanup_paths.append(temp_dir)
+            temp_dir = Path(tempfile.mkdtemp(prefix="ghosttype-audio-"))
+
+            max_len = max(segment.size for segment in segments)
+            scratch_f = np.empty(max_len, dtype=np.float32)
+            scratch_i = np.empty(max_len, dtype=np.int16)
+            for index, segment in enumerate(segments):
+                clipped = np.clip(segment, -1.0, 1.0).astype(np.float32, copy=False)
+                if clipped.size < frame_size:
+                    continue
+                segment_path = temp_dir / f"segment-{index:03d}.wav"
+                self._write_wav_mono_16k_int16_into(segment_path, clipped, scratch_f, scratch_i)
+                cleanup_paths.append(segment_path)
+                transcribe_paths.append(str(segment_path))
+
+            if not transcribe_paths:
+                stats["segment_write_fallback"] = True
+                cleanup_paths = []
+                transcribe_paths = [audio_path]
+                try:
+                    temp_dir.rmdir()
+                except Exception:
+                    pass
+            else:
+                cleanup_paths.append(temp_dir)
+                root_temp_dir = temp_dir
 
         stats["transcribe_segments"] = len(transcribe_paths)
         stats["preprocess_total_ms"] = round((time.perf_counter() - t0) * 1000.0, 2)
@@ -1654,6 +2301,7 @@ class ResidentModelRuntime:
             transcribe_paths=transcribe_paths,
             cleanup_paths=cleanup_paths,
             stats=stats,
+            root_temp_dir=root_temp_dir,
         )
 
     def _build_v2_engine_config(self, audio_config: AudioEnhancementConfig) -> Any | None:
@@ -1699,43 +2347,48 @@ class ResidentModelRuntime:
 
     def _speech_mask_from_vad_flags(
         self,
-        vad_flags: list[bool],
+        vad_flags: np.ndarray,
         frame_size: int,
         total_samples: int,
     ) -> np.ndarray:
         if total_samples <= 0:
             return np.zeros(0, dtype=np.bool_)
-        mask = np.zeros(total_samples, dtype=np.bool_)
-        for index, is_speech in enumerate(vad_flags):
-            if not is_speech:
-                continue
-            start = index * frame_size
-            end = min(total_samples, start + frame_size)
-            if start >= end:
-                break
-            mask[start:end] = True
-        return mask
+        # 逐帧标记展开成逐样本掩码:一次 repeat 替掉逐帧的 Python 切片赋值。
+        flags = np.asarray(vad_flags, dtype=np.bool_)
+        mask = np.repeat(flags, frame_size)
+        if mask.size >= total_samples:
+            return mask[:total_samples]
+        padded = np.zeros(total_samples, dtype=np.bool_)
+        padded[: mask.size] = mask
+        return padded
 
     def _apply_enhancement_v2(
         self,
         signal: np.ndarray,
         audio_config: AudioEnhancementConfig,
-    ) -> tuple[np.ndarray, dict[str, Any]]:
+    ) -> tuple[np.ndarray, dict[str, Any], tuple[np.ndarray, dict[str, Any]] | None]:
+        """Run the v2 enhancement chain.
+
+        Returns (signal, stats, probe_vad):probe_vad 是探测 VAD 的
+        (flags, stats),增强不改变时长,调用方分段时可直接复用,
+        免掉对增强后信号的第二次整段 VAD。
+        """
         if EnhancementEngine is None:
             legacy_signal, legacy_stats = self._apply_low_volume_boost_and_limiter(signal, audio_config)
             legacy_stats["v2_backend"] = "legacy_fallback_module_missing"
-            return legacy_signal, legacy_stats
+            return legacy_signal, legacy_stats, None
 
         frame_size = 160
         probe_frames = self._split_into_frames(signal, frame_size=frame_size)
         probe_vad_engine = str(audio_config.vad.get("engine", "webrtcvad") or "webrtcvad")
         probe_vad_aggressiveness = int(_clamp_float(audio_config.vad.get("aggressiveness"), 1, 0, 3))
-        probe_flags, _ = self._detect_speech_frames(
+        probe_flags, probe_stats = self._detect_speech_frames(
             probe_frames,
             audio_config,
             vad_engine_override=probe_vad_engine,
             vad_aggressiveness=probe_vad_aggressiveness,
         )
+        probe_vad = (probe_flags, probe_stats)
         speech_mask = self._speech_mask_from_vad_flags(
             probe_flags,
             frame_size=frame_size,
@@ -1746,29 +2399,32 @@ class ResidentModelRuntime:
         if v2_config is None:
             legacy_signal, legacy_stats = self._apply_low_volume_boost_and_limiter(signal, audio_config)
             legacy_stats["v2_backend"] = "legacy_fallback_config_missing"
-            return legacy_signal, legacy_stats
+            return legacy_signal, legacy_stats, probe_vad
 
         try:
             engine = EnhancementEngine(v2_config)
             result = engine.process(signal=signal, sample_rate=16000, speech_mask=speech_mask)
             stats = dict(result.stats)
             stats["v2_backend"] = "enhancement_engine_v2"
-            return result.signal.astype(np.float32, copy=False), stats
+            return result.signal.astype(np.float32, copy=False), stats, probe_vad
         except Exception as exc:
             legacy_signal, legacy_stats = self._apply_low_volume_boost_and_limiter(signal, audio_config)
             legacy_stats["v2_backend"] = "legacy_fallback_runtime_error"
             legacy_stats["v2_error"] = str(exc)
-            return legacy_signal, legacy_stats
+            return legacy_signal, legacy_stats, probe_vad
 
     def _detect_speech_frames(
         self,
-        frames: list[np.ndarray],
+        frames: np.ndarray,
         audio_config: AudioEnhancementConfig,
         vad_engine_override: str | None = None,
         vad_aggressiveness: int | None = None,
-    ) -> tuple[list[bool], dict[str, Any]]:
-        if not frames:
-            return [], {"vad_frame_count": 0, "vad_speech_ratio": 0.0, "vad_backend": "none"}
+    ) -> tuple[np.ndarray, dict[str, Any]]:
+        if len(frames) == 0:
+            return (
+                np.zeros(0, dtype=np.bool_),
+                {"vad_frame_count": 0, "vad_speech_ratio": 0.0, "vad_backend": "none"},
+            )
 
         aggressiveness_map = {
             "low": 0,
@@ -1782,9 +2438,18 @@ class ResidentModelRuntime:
             "high": -55.0,
         }
 
-        flags: list[bool] = []
         backend = "energy_gate"
         requested_engine = (vad_engine_override or "webrtcvad").strip().lower()
+        frame_size = frames.shape[1]
+        flags: np.ndarray | None = None
+
+        if requested_engine == "silero":
+            threshold_map = {"low": 0.3, "moderate": 0.5, "high": 0.6, "veryhigh": 0.7}
+            flags = self._silero_vad_flags(
+                frames, threshold_map[audio_config.noise_suppression_level]
+            )
+            if flags is not None:
+                backend = "silero_onnx"
 
         detector = None
         webrtc_aggressiveness = aggressiveness_map[audio_config.noise_suppression_level]
@@ -1798,7 +2463,7 @@ class ResidentModelRuntime:
                 or audio_config.enhancement_version == "v2"
             )
         )
-        if allow_webrtc:
+        if allow_webrtc and flags is None:
             try:
                 detector = webrtcvad.Vad(webrtc_aggressiveness)
                 backend = "webrtcvad"
@@ -1808,25 +2473,34 @@ class ResidentModelRuntime:
         rms_gate = rms_gate_map.get(audio_config.low_volume_boost, -52.0)
         peak_gate = rms_gate + 8.0
         webrtc_errors = 0
-        for frame in frames:
-            speech = False
-            if detector is not None:
-                try:
-                    frame_pcm16 = self._float_to_pcm16(frame).tobytes()
-                    speech = bool(detector.is_speech(frame_pcm16, 16000))
-                except Exception:
-                    webrtc_errors += 1
-                    detector = None
-                    backend = "energy_gate"
-
-            if detector is None:
-                rms_db = self._estimate_rms_dbfs(frame)
-                peak_db = self._estimate_peak_dbfs(frame)
-                speech = rms_db >= rms_gate or peak_db >= peak_gate
 
-            flags.append(speech)
-
-        speech_count = sum(1 for item in flags if item)
+        if detector is not None and flags is None:
+            # 一次性转 int16 bytes,逐帧只做切片,避免每帧一次 tobytes()。
+            pcm_bytes = self._float_to_pcm16(frames).tobytes()
+            bytes_per_frame = frame_size * 2
+            is_speech = detector.is_speech
+            try:
+                flags = np.fromiter(
+                    (
+                        is_speech(pcm_bytes[offset : offset + bytes_per_frame], 16000)
+                        for offset in range(0, len(pcm_bytes), bytes_per_frame)
+                    ),
+                    dtype=np.bool_,
+                    count=len(frames),
+                )
+            except Exception:
+                webrtc_errors += 1
+                backend = "energy_gate"
+                flags = None
+
+        if flags is None:
+            # 批量能量门限:一趟 einsum 算出所有帧的 RMS,再向量化比较。
+            mean_square = np.einsum("ij,ij->i", frames, frames, dtype=np.float64) / frame_size
+            rms_db = 20.0 * np.log10(np.maximum(np.sqrt(mean_square), 1e-7))
+            peak_db = 20.0 * np.log10(np.maximum(np.max(np.abs(frames), axis=1), 1e-7))
+            flags = (rms_db >= rms_gate) | (peak_db >= peak_gate)
+
+        speech_count = int(np.count_nonzero(flags))
         stats = {
             "vad_backend": backend,
             "vad_frame_count": len(flags),
@@ -1841,15 +2515,48 @@ class ResidentModelRuntime:
             stats["vad_webrtc_errors"] = webrtc_errors
         return flags, stats
 
+    def _silero_vad_flags(self, frames: np.ndarray, threshold: float) -> np.ndarray | None:
+        """Run Silero VAD over the whole utterance in one batched ONNX call.
+
+        一次 session.run 替掉每 10ms 一次的 C 调用;512 采样(32ms)窗的
+        概率按样本对齐映射回 10ms 帧网格。批内各窗独立(不携带 RNN 状态),
+        对分段用途足够。失败返回 None,调用方回退到 webrtcvad/能量门限。
+        """
+        session = _silero_vad_session()
+        if session is None:
+            return None
+        try:
+            flat = np.ascontiguousarray(frames, dtype=np.float32).reshape(-1)
+            window = 512
+            n_windows = -(-flat.size // window)
+            padded = np.zeros(n_windows * window, dtype=np.float32)
+            padded[: flat.size] = flat
+            batch = padded.reshape(n_windows, window)
+            feeds: dict[str, Any] = {"input": batch}
+            input_names = {item.name for item in session.get_inputs()}
+            if "sr" in input_names:
+                feeds["sr"] = np.array(16000, dtype=np.int64)
+            if "state" in input_names:
+                feeds["state"] = np.zeros((2, n_windows, 128), dtype=np.float32)
+            probs = np.asarray(session.run(None, feeds)[0], dtype=np.float32).reshape(-1)
+            if probs.size != n_windows:
+                return None
+            frame_size = frames.shape[1]
+            frame_starts = np.arange(len(frames), dtype=np.int64) * frame_size
+            window_index = np.minimum(frame_starts // window, n_windows - 1)
+            return probs[window_index] >= threshold
+        except Exception:
+            return None
+
     def _segment_by_vad(
         self,
-        frames: list[np.ndarray],
-        vad_flags: list[bool],
+        frames: np.ndarray,
+        vad_flags: np.ndarray,
         anti_cutoff_pause_ms: int,
         frame_size: int,
         pre_roll_ms: int = 100,
     ) -> tuple[list[np.ndarray], dict[str, Any]]:
-        if not frames or not vad_flags:
+        if len(frames) == 0 or len(vad_flags) == 0:
             return [], {"segment_count": 0}
 
         enter_speech_frames = 3
@@ -1859,12 +2566,28 @@ class ResidentModelRuntime:
         adaptive_min_exit_frames = max(12, min(18, int(round(base_exit_silence_frames * 0.5))))
         max_segment_frames = int((30 * 16000) / frame_size)
 
+        # 状态机只依赖 vad_flags,帧内容到发射段时才用得上:循环里全部换成
+        # 帧下标记账,段直接从连续帧矩阵上切平坦视图,不再逐帧 append +
+        # np.concatenate。自适应快退的 600ms 静音窗用一次 cumsum 预计算,
+        # 替掉每帧对 deque 的 any() 扫描。
+        flags = np.asarray(vad_flags, dtype=np.bool_)
+        n_frames = len(flags)
+        window = adaptive_window_frames
+        stable_silence = np.zeros(n_frames, dtype=np.bool_)
+        if n_frames >= window:
+            csum = np.cumsum(flags, dtype=np.int32)
+            window_sums = csum[window - 1 :].copy()
+            window_sums[1:] -= csum[: n_frames - window]
+            stable_silence[window - 1 :] = window_sums == 0
+        flags_list = flags.tolist()
+        stable_list = stable_silence.tolist()
+        flat = np.ascontiguousarray(frames, dtype=np.float32).reshape(-1)
+
         in_segment = False
         speech_run = 0
         silence_run = 0
-        recent_flags = deque(maxlen=adaptive_window_frames)
-        pre_roll = deque(maxlen=pre_roll_frames)
-        current_frames: list[np.ndarray] = []
+        seg_start = 0
+        seg_len = 0
         segments: list[np.ndarray] = []
 
         pre_roll_hits = 0
@@ -1872,55 +2595,58 @@ class ResidentModelRuntime:
         ignored_short_segments = 0
         adaptive_fast_exit_hits = 0
 
-        for frame, is_speech in zip(frames, vad_flags):
-            recent_flags.append(is_speech)
-            pre_roll.append(frame)
+        for index in range(n_frames):
+            is_speech = flags_list[index]
 
             if not in_segment:
                 speech_run = speech_run + 1 if is_speech else 0
                 if speech_run >= enter_speech_frames:
                     in_segment = True
-                    if len(pre_roll) > enter_speech_frames:
+                    roll = min(pre_roll_frames, index + 1) if pre_roll_frames else 0
+                    if roll > enter_speech_frames:
                         pre_roll_hits += 1
-                    current_frames = list(pre_roll)
+                    seg_start = index + 1 - roll
+                    seg_len = roll
                     silence_run = 0
                     speech_run = 0
                 continue
 
-            current_frames.append(frame)
+            seg_len += 1
             silence_run = 0 if is_speech else silence_run + 1
 
-            if len(current_frames) >= max_segment_frames:
-                segments.append(np.concatenate(current_frames, axis=0))
-                current_frames = []
+            if seg_len >= max_segment_frames:
+                segments.append(
+                    flat[seg_start * frame_size : (seg_start + seg_len) * frame_size]
+                )
+                seg_start = index + 1
+                seg_len = 0
                 forced_split_count += 1
                 silence_run = 0
                 continue
 
             effective_exit_frames = base_exit_silence_frames
-            stable_recent_silence = (
-                len(recent_flags) >= adaptive_window_frames and not any(recent_flags)
-            )
-            if stable_recent_silence:
+            if stable_list[index]:
                 effective_exit_frames = adaptive_min_exit_frames
                 adaptive_fast_exit_hits += 1
 
             if silence_run >= effective_exit_frames:
-                keep_frames = max(1, len(current_frames) - max(0, silence_run - 2))
-                segment = np.concatenate(current_frames[:keep_frames], axis=0)
-                if segment.size >= frame_size * 3:
-                    segments.append(segment)
+                keep_frames = max(1, seg_len - max(0, silence_run - 2))
+                if keep_frames >= 3:
+                    segments.append(
+                        flat[seg_start * frame_size : (seg_start + keep_frames) * frame_size]
+                    )
                 else:
                     ignored_short_segments += 1
-                current_frames = []
+                seg_len = 0
                 in_segment = False
                 speech_run = 0
                 silence_run = 0
 
-        if current_frames:
-            tail = np.concatenate(current_frames, axis=0)
-            if tail.size >= frame_size * 3:
-                segments.append(tail)
+        if in_segment and seg_len > 0:
+            if seg_len >= 3:
+                segments.append(
+                    flat[seg_start * frame_size : (seg_start + seg_len) * frame_size]
+                )
             else:
                 ignored_short_segments += 1
 
@@ -1952,8 +2678,7 @@ class ResidentModelRuntime:
 
         max_gain_db = max_gain_map.get(audio_config.low_volume_boost, 12.0)
         target_rms_db = target_rms_map.get(audio_config.low_volume_boost, -24.0)
-        input_rms_db = self._estimate_rms_dbfs(signal)
-        input_peak_db = self._estimate_peak_dbfs(signal)
+        input_rms_db, input_peak_db = self._rms_peak_dbfs(signal)
         if input_rms_db >= (target_rms_db - 1.0) and input_peak_db >= -8.0:
             return signal.astype(np.float32, copy=False), {
                 "gain_skipped": True,
@@ -1964,28 +2689,25 @@ class ResidentModelRuntime:
                 "gain_peak_db": 0.0,
             }
 
-        processed = np.empty_like(signal, dtype=np.float32)
-        frame_size = 160  # 10ms
-        gain_values: list[float] = []
-        current_gain_db = 0.0
-
-        for start in range(0, signal.size, frame_size):
-            end = min(start + frame_size, signal.size)
-            frame = signal[start:end]
-            frame_rms_db = self._estimate_rms_dbfs(frame)
-
-            desired_gain_db = max(0.0, min(max_gain_db, target_rms_db - frame_rms_db))
-            attack = 0.25
-            release = 0.08
-            smoothing = attack if desired_gain_db > current_gain_db else release
-            current_gain_db += smoothing * (desired_gain_db - current_gain_db)
-            gain_values.append(current_gain_db)
-
-            gain_linear = 10.0 ** (current_gain_db / 20.0)
-            processed[start:end] = frame * gain_linear
-
-        avg_gain = float(np.mean(gain_values)) if gain_values else 0.0
-        max_gain = float(np.max(gain_values)) if gain_values else 0.0
+        # 分帧 RMS 与期望增益全部向量化,只剩状态相关的攻击/释放递推
+        # 逐帧跑(每秒 100 次,njit 可用时进一步编译)。
+        signal32 = np.ascontiguousarray(signal, dtype=np.float32)
+        frame_size = 160
+        n_frames = -(-signal32.size // frame_size)
+        padded = signal32
+        if n_frames * frame_size != signal32.size:
+            padded = np.zeros(n_frames * frame_size, dtype=np.float32)
+            padded[: signal32.size] = signal32
+        frames = padded.reshape(n_frames, frame_size)
+        sq_sum = np.einsum("ij,ij->i", frames, frames, dtype=np.float64)
+        counts = np.full(n_frames, float(frame_size))
+        counts[-1] = signal32.size - (n_frames - 1) * frame_size
+        frame_rms_db = 20.0 * np.log10(np.maximum(np.sqrt(sq_sum / counts), 1e-7))
+        desired_db = np.clip(target_rms_db - frame_rms_db, 0.0, max_gain_db)
+        gains_db = np.empty(n_frames, dtype=np.float64)
+        avg_gain, max_gain = lvb_smooth(desired_db, gains_db)
+        gain_linear = (10.0 ** (gains_db / 20.0)).astype(np.float32)
+        processed = (frames * gain_linear[:, None]).ravel()[: signal32.size]
         stats = {
             "gain_target_rms_dbfs": round(target_rms_db, 2),
             "gain_max_allowed_db": round(max_gain_db, 2),
@@ -1995,11 +2717,16 @@ class ResidentModelRuntime:
         return processed.astype(np.float32, copy=False), stats
 
     def _apply_soft_limiter(self, signal: np.ndarray) -> tuple[np.ndarray, dict[str, Any]]:
-        tanh_denom = math.tanh(1.6)
-        limiter_hits = int(np.count_nonzero(np.abs(signal) > 0.97))
-        limited = np.tanh(signal * 1.6) / tanh_denom
-        out = np.clip(limited, -1.0, 1.0).astype(np.float32, copy=False)
-        return out, {"limiter_trigger_count": limiter_hits}
+        # 缩放/tanh/归一/clip 全部原地做在同一块输出缓冲上,整条链只分配
+        # 一次;注意 tanh(1.6x)/tanh(1.6) 上界是 ±1/tanh(1.6)≈±1.08,
+        # 热信号下最后的 clip 并不是死代码。
+        inv_denom = np.float32(1.0 / math.tanh(1.6))
+        out = np.multiply(signal, np.float32(1.6))
+        limiter_hits = int(np.count_nonzero(np.abs(out) > np.float32(0.97 * 1.6)))
+        np.tanh(out, out=out)
+        np.multiply(out, inv_denom, out=out)
+        np.clip(out, -1.0, 1.0, out=out)
+        return out.astype(np.float32, copy=False), {"limiter_trigger_count": limiter_hits}
 
     def _apply_high_pass_filter(
         self,
@@ -2010,14 +2737,11 @@ class ResidentModelRuntime:
         if signal.size < 2 or cutoff_hz <= 0:
             return signal, {"hpf_enabled": False}
 
-        dt = 1.0 / float(sample_rate)
-        rc = 1.0 / (2.0 * math.pi * cutoff_hz)
-        alpha = rc / (rc + dt)
+        alpha = _hpf_alpha(cutoff_hz, sample_rate)
 
-        output = np.empty_like(signal, dtype=np.float32)
-        output[0] = signal[0]
-        for i in range(1, signal.size):
-            output[i] = alpha * (output[i - 1] + signal[i] - signal[i - 1])
+        signal32 = np.ascontiguousarray(signal, dtype=np.float32)
+        output = np.empty_like(signal32)
+        hpf_kernel(signal32, alpha, output)
 
         stats = {
             "hpf_enabled": True,
@@ -2073,6 +2797,7 @@ class ResidentModelRuntime:
 
         processed = np.empty_like(signal, dtype=np.float32)
         processed_frames = 0
+        inv_scale = np.float32(1.0 / 32768.0)
         for start in range(0, signal.size, frame_size):
             end = min(start + frame_size, signal.size)
             frame = signal[start:end]
@@ -2082,20 +2807,28 @@ class ResidentModelRuntime:
                 frame_in = frame
 
             try:
-                payload = self._float_to_pcm16(frame_in).tobytes()
+                payload = self._frame_to_pcm16_bytes(frame_in)
                 out_payload = apm.process_stream(payload)
                 if isinstance(out_payload, str):
                     out_payload = out_payload.encode("latin1")
-                out_frame = np.frombuffer(out_payload, dtype=np.int16).astype(np.float32) / 32768.0
-                if out_frame.size < frame_size:
-                    out_frame = np.pad(out_frame, (0, frame_size - out_frame.size))
+                # int16 输出直接乘进 processed 的目标切片,不再经过
+                # astype/除法/np.pad 三趟逐帧临时数组。
+                out_i16 = np.frombuffer(out_payload, dtype=np.int16)
+                count = min(end - start, out_i16.size)
+                np.multiply(
+                    out_i16[:count],
+                    inv_scale,
+                    out=processed[start : start + count],
+                    casting="unsafe",
+                )
+                if count < end - start:
+                    processed[start + count : end] = 0.0
             except Exception as exc:
                 return signal, {
                     "apm_backend": "error",
                     "apm_error": f"process_failed: {exc}",
                 }
 
-            processed[start:end] = out_frame[: end - start]
             processed_frames += 1
 
         stats = {
@@ -2129,25 +2862,32 @@ class ResidentModelRuntime:
             raw = wf.readframes(frame_count)
         read_ms = (time.perf_counter() - t0) * 1000.0
 
+        owns_buffer = False
         if sample_width == 2:
-            data = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+            data = self._pcm16_to_float32(np.frombuffer(raw, dtype="<i2"))
         elif sample_width == 4:
-            data = np.frombuffer(raw, dtype="<i4").astype(np.float32) / 2147483648.0
+            raw_i32 = np.frombuffer(raw, dtype="<i4")
+            data = np.empty(raw_i32.size, dtype=np.float32)
+            np.multiply(raw_i32, np.float32(1.0 / 2147483648.0), out=data, casting="unsafe")
+            owns_buffer = True
         elif sample_width == 3:
-            pcm = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3)
-            signed = (
-                pcm[:, 0].astype(np.int32)
-                | (pcm[:, 1].astype(np.int32) << 8)
-                | (pcm[:, 2].astype(np.int32) << 16)
-            )
-            signed = np.where((signed & 0x800000) != 0, signed - 0x1000000, signed)
-            data = signed.astype(np.float32) / 8388608.0
+            # 每 3 字节补一个低位零凑成 4 字节小端 int32,view 后算术右移 8
+            # 恢复符号,替掉逐列拼装 + where 的五趟临时数组。
+            pcm = np.frombuffer(raw, dtype=np.uint8)
+            usable_bytes = (pcm.size // 3) * 3
+            padded = np.zeros((usable_bytes // 3, 4), dtype=np.uint8)
+            padded[:, 1:] = pcm[:usable_bytes].reshape(-1, 3)
+            signed = padded.view("<i4").reshape(-1) >> 8
+            data = signed.astype(np.float32)
+            np.multiply(data, np.float32(1.0 / 8388608.0), out=data)
+            owns_buffer = True
         else:
             raise ValueError(f"Unsupported WAV sample width: {sample_width}")
 
         if channels > 1:
             usable = (data.size // channels) * channels
-            data = data[:usable].reshape(-1, channels).mean(axis=1)
+            data = data[:usable].reshape(-1, channels).mean(axis=1, dtype=np.float32)
+            owns_buffer = True
 
         resample_ms = 0.0
         if sample_rate != 16000:
@@ -2155,6 +2895,7 @@ class ResidentModelRuntime:
             data = self._resample_linear(data, src_rate=sample_rate, dst_rate=16000)
             resample_ms = (time.perf_counter() - t1) * 1000.0
             sample_rate = 16000
+            owns_buffer = True
 
         stats = {
             "input_sample_rate": original_sample_rate,
@@ -2165,6 +2906,11 @@ class ResidentModelRuntime:
             "audio_load_ms": round(read_ms, 2),
             "audio_resample_ms": round(resample_ms, 2),
         }
+        if sample_width == 2:
+            # int16/32768 天然落在 [-1, 1) 内,clip 可省;但单声道不重采样
+            # 时 data 还指向 _pcm16_to_float32 的 scratch,必须脱离共享缓冲。
+            waveform = data.astype(np.float32, copy=False) if owns_buffer else data.copy()
+            return waveform, stats
         return np.clip(data.astype(np.float32, copy=False), -1.0, 1.0), stats
 
     def _write_wav_mono_16k_int16(self, path: Path, signal: np.ndarray) -> None:
@@ -2175,25 +2921,84 @@ class ResidentModelRuntime:
             wf.setframerate(16000)
             wf.writeframes(pcm16.tobytes())
 
-    def _split_into_frames(self, signal: np.ndarray, frame_size: int) -> list[np.ndarray]:
+    def _write_wav_mono_16k_int16_into(
+        self,
+        path: Path,
+        signal: np.ndarray,
+        scratch_f: np.ndarray,
+        scratch_i: np.ndarray,
+    ) -> None:
+        """Segment WAV write using caller-provided scratch buffers.
+
+        The float32/int16 scratch slices are reused across segments so a
+        multi-segment request does one allocation instead of one per write.
+        """
+        n = signal.size
+        f = scratch_f[:n]
+        np.multiply(signal, 32767.0, out=f)
+        np.rint(f, out=f)
+        np.clip(f, -32768.0, 32767.0, out=f)
+        i16 = scratch_i[:n]
+        np.copyto(i16, f, casting="unsafe")
+        with wave.open(str(path), "wb") as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(16000)
+            wf.writeframes(i16.tobytes())
+
+    def _split_into_frames(self, signal: np.ndarray, frame_size: int) -> np.ndarray:
+        """Return the signal as an (n_frames, frame_size) float32 array.
+
+        The tail is zero-padded to a full frame; when no padding is needed the
+        result is a zero-copy reshape view of the input.
+        """
         if signal.size == 0:
-            return []
-        frames: list[np.ndarray] = []
-        for start in range(0, signal.size, frame_size):
-            end = min(start + frame_size, signal.size)
-            frame = signal[start:end]
-            if frame.size < frame_size:
-                frame = np.pad(frame, (0, frame_size - frame.size))
-            frames.append(frame.astype(np.float32, copy=False))
-        return frames
+            return np.empty((0, frame_size), dtype=np.float32)
+        signal = np.ascontiguousarray(signal, dtype=np.float32)
+        remainder = signal.size % frame_size
+        if remainder:
+            signal = np.pad(signal, (0, frame_size - remainder))
+        return signal.reshape(-1, frame_size)
+
+    def _frame_to_pcm16_bytes(self, frame: np.ndarray) -> bytes:
+        # 单帧版本:clip/scale/rint 全部原地做在常驻 scratch 上,唯一的
+        # 分配是 is_speech/APM 需要的 bytes 对象本身。
+        scratch_f = self._frame_scratch_f
+        scratch_i = self._frame_scratch_i
+        if frame.size != scratch_f.size:
+            scratch_f = self._frame_scratch_f = np.empty(frame.size, dtype=np.float32)
+            scratch_i = self._frame_scratch_i = np.empty(frame.size, dtype=np.int16)
+        np.clip(frame, -1.0, 1.0, out=scratch_f)
+        np.multiply(scratch_f, 32767.0, out=scratch_f)
+        np.rint(scratch_f, out=scratch_f)
+        np.copyto(scratch_i, scratch_f, casting="unsafe")
+        return scratch_i.tobytes()
 
     def _float_to_pcm16(self, signal: np.ndarray) -> np.ndarray:
-        clipped = np.clip(signal, -1.0, 1.0)
-        return np.round(clipped * 32767.0).astype(np.int16, copy=False)
+        # clip/scale/round 全部原地做在复用的 float32 scratch 上,
+        # 每次调用只为 int16 结果分配一次。
+        flat = np.ascontiguousarray(signal, dtype=np.float32).reshape(-1)
+        scratch = self._pcm16_scratch_f
+        if scratch is None or scratch.size < flat.size:
+            scratch = np.empty(flat.size, dtype=np.float32)
+            self._pcm16_scratch_f = scratch
+        buf = scratch[: flat.size]
+        np.clip(flat, -1.0, 1.0, out=buf)
+        np.multiply(buf, 32767.0, out=buf)
+        np.rint(buf, out=buf)
+        return buf.astype(np.int16).reshape(signal.shape)
 
     def _resample_linear(self, signal: np.ndarray, src_rate: int, dst_rate: int) -> np.ndarray:
         if signal.size == 0 or src_rate == dst_rate:
             return signal.astype(np.float32, copy=False)
+        if _scipy_resample_poly is not None:
+            # 多相 FIR 在 C 里跑,不需要 float64 升频也没有 linspace 临时数组,
+            # 质量还优于线性插值。
+            g = math.gcd(src_rate, dst_rate)
+            out = _scipy_resample_poly(
+                signal.astype(np.float32, copy=False), dst_rate // g, src_rate // g
+            )
+            return np.asarray(out, dtype=np.float32)
         src_len = signal.size
         dst_len = max(1, int(round(src_len * float(dst_rate) / float(src_rate))))
         src_x = np.linspace(0.0, 1.0, num=src_len, endpoint=False)
@@ -2201,10 +3006,24 @@ class ResidentModelRuntime:
         out = np.interp(dst_x, src_x, signal.astype(np.float64))
         return out.astype(np.float32, copy=False)
 
+    def _rms_peak_dbfs(self, signal: np.ndarray) -> tuple[float, float]:
+        """Fused RMS + peak level estimate reading the buffer once."""
+        if signal.size == 0:
+            return -120.0, -120.0
+        square_sum = float(np.einsum("i,i->", signal, signal, dtype=np.float64))
+        peak = float(np.max(np.abs(signal)))
+        rms = math.sqrt(square_sum / signal.size)
+        return (
+            20.0 * math.log10(max(rms, 1e-7)),
+            20.0 * math.log10(max(peak, 1e-7)),
+        )
+
     def _estimate_rms_dbfs(self, signal: np.ndarray) -> float:
         if signal.size == 0:
             return -120.0
-        rms = float(np.sqrt(np.mean(np.square(signal, dtype=np.float64))))
+        # einsum 直接做 float64 累加,省掉 np.square 的整块 float64 临时数组。
+        square_sum = float(np.einsum("i,i->", signal, signal, dtype=np.float64))
+        rms = math.sqrt(square_sum / signal.size)
         return 20.0 * math.log10(max(rms, 1e-7))
 
     def _estimate_peak_dbfs(self, signal: np.ndarray) -> float:
@@ -2238,20 +3057,128 @@ class ResidentModelRuntime:
             "preprocess_ms": stats.get("preprocess_total_ms", 0.0),
         }
         print(
-            f"[audio-enhancement] {json.dumps(summary, ensure_ascii=False)}",
+            f"[audio-enhancement] {_json_dumps_compact(summary)}",
             flush=True,
         )
         if debug:
             print(
-                f"[audio-enhancement-debug] {json.dumps(stats, ensure_ascii=False)}",
+                f"[audio-enhancement-debug] {_json_dumps_compact(stats)}",
                 flush=True,
             )
 
+    def _personalization_mtimes(self) -> tuple[int, int]:
+        try:
+            dict_mtime = self.dictionary_path.stat().st_mtime_ns
+        except OSError:
+            dict_mtime = -1
+        try:
+            style_mtime = self.style_profile_path.stat().st_mtime_ns
+        except OSError:
+            style_mtime = -1
+        return dict_mtime, style_mtime
+
+    def _prompt_cache_split(
+        self,
+        model: Any,
+        tokenizer: Any,
+        messages: list[dict[str, str]],
+        prompt: str,
+    ) -> tuple[str, Any | None]:
+        """Split the rendered prompt into (suffix, cloned KV cache) when possible.
+
+        The system prompt is identical across requests for a given mode and
+        personalization version, so its token prefix is prefiled into a KV
+        cache once and cloned per request. Prefill then only covers the user
+        turn instead of the full prompt. Returns (prompt, None) when caching
+        is unavailable or the prefix does not match.
+        """
+        make_prompt_cache = _make_prompt_cache_fn()
+        if make_prompt_cache is None or not messages or messages[0].get("role") != "system":
+            return prompt, None
+
+        system_content = messages[0]["content"]
+        version = self._personalization_mtimes()
+        entry = self._prompt_prefix_caches.get(system_content)
+        if entry is None or entry[0] != version:
+            try:
+                import mlx.core as mx
+
+                prefix = tokenizer.apply_chat_template(
+                    [messages[0]],
+                    tokenize=False,
+                    add_generation_prompt=False,
+                )
+                prefix_ids = tokenizer.encode(prefix)
+                cache, prefilled = self._fork_longest_shared_prefix(prefix_ids, version)
+                if cache is None:
+                    cache = make_prompt_cache(model)
+                    prefilled = 0
+                if prefilled < len(prefix_ids):
+                    mx.eval(model(mx.array(prefix_ids[prefilled:])[None], cache=cache))
+            except Exception:
+                return prompt, None
+            if len(self._prompt_prefix_caches) >= 8:
+                # Stale entries accumulate when personalization changes; a
+                # full reset is cheap relative to the prefill it saves.
+                self._prompt_prefix_caches.clear()
+            entry = (version, prefix, prefix_ids, cache)
+            self._prompt_prefix_caches[system_content] = entry
+
+        _, prefix, _, cache = entry
+        if not prompt.startswith(prefix):
+            return prompt, None
+        try:
+            return prompt[len(prefix):], copy.deepcopy(cache)
+        except Exception:
+            # 克隆失败时退回整段 prefill,而不是让每个请求都 500。
+            return prompt, None
+
+    def _fork_longest_shared_prefix(self, prefix_ids: list[int], version: tuple[int, int]) -> tuple[Any | None, int]:
+        """Fork the cached prefix with the longest shared token prefix.
+
+        The mode templates and the personalization tail overlap heavily at the
+        token level, so instead of prefilling a new system prompt from scratch
+        we clone the closest existing KV cache, trim it back to the common
+        prefix, and only prefill the divergent remainder.
+        """
+        try:
+            from mlx_lm.models.cache import can_trim_prompt_cache, trim_prompt_cache
+        except Exception:  # pragma: no cover - older mlx-lm layouts
+            return None, 0
+
+        best_entry: tuple[Any, int, int] | None = None  # (cache, lcp, cached_len)
+        for cached_version, _, cached_ids, cached_cache in self._prompt_prefix_caches.values():
+            if cached_version != version:
+                continue
+            lcp = 0
+            for a, b in zip(prefix_ids, cached_ids):
+                if a != b:
+                    break
+                lcp += 1
+            if best_entry is None or lcp > best_entry[1]:
+                best_entry = (cached_cache, lcp, len(cached_ids))
+
+        # 公共前缀太短时,克隆+裁剪不划算,直接整段 prefill。
+        if best_entry is None or best_entry[1] < 16:
+            return None, 0
+        cache, lcp, cached_len = best_entry
+        try:
+            forked = copy.deepcopy(cache)
+            if cached_len > lcp:
+                if not can_trim_prompt_cache(forked):
+                    return None, 0
+                trim_prompt_cache(forked, cached_len - lcp)
+            return forked, lcp
+        except Exception:
+            return None, 0
+
     def _generate_chat(
         self,
         messages: list[dict[str, str]],
         max_tokens: int,
         try_generation_lock: bool = False,
+        abort_check: Any = None,
+        stop_on_json: bool = False,
     ) -> str:
         acquired = self._generation_lock.acquire(blocking=not try_generation_lock)
         if not acquired:
@@ -2264,16 +3191,55 @@ class ResidentModelRuntime:
                 add_generation_prompt=True,
             )
 
+            suffix_prompt, prompt_cache = self._prompt_cache_split(model, tokenizer, messages, prompt)
+            _, stream_generate = _mlx_lm()
+
             output_parts: list[str] = []
             try:
-                iterator = stream_generate(model, tokenizer, prompt, max_tokens=max_tokens)
+                if prompt_cache is not None:
+                    iterator = stream_generate(
+                        model,
+                        tokenizer,
+                        suffix_prompt,
+                        max_tokens=max_tokens,
+                        prompt_cache=prompt_cache,
+                    )
+                else:
+                    iterator = stream_generate(model, tokenizer, prompt, max_tokens=max_tokens)
             except TypeError:
                 iterator = stream_generate(model, tokenizer, prompt=prompt, max_tokens=max_tokens)
 
+            # stop_on_json:对只要一个小 JSON 对象的调用(搜索决策、风格
+            # 抽取),首个对象闭合即停,不用烧满 max_tokens。花括号深度跨
+            # token 记账,并跳过字符串字面量里的括号。
+            depth = 0
+            seen_object = False
+            in_string = False
+            escaped = False
             for response in iterator:
+                if abort_check is not None and abort_check():
+                    # 后台任务让位:交互请求到达时最多再等一个 token 就放锁。
+                    return ""
                 token = self._stream_chunk_to_text(response)
                 if token:
                     output_parts.append(token)
+                    if stop_on_json:
+                        for ch in token:
+                            if escaped:
+                                escaped = False
+                                continue
+                            if ch == "\\":
+                                escaped = in_string
+                            elif ch == '"':
+                                in_string = not in_string
+                            elif not in_string:
+                                if ch == "{":
+                                    depth += 1
+                                    seen_object = True
+                                elif ch == "}":
+                                    depth -= 1
+                        if seen_object and depth <= 0:
+                            break
             return "".join(output_parts).strip()
         finally:
             self._generation_lock.release()
@@ -2287,8 +3253,20 @@ class ResidentModelRuntime:
                 add_generation_prompt=True,
             )
 
+            suffix_prompt, prompt_cache = self._prompt_cache_split(model, tokenizer, messages, prompt)
+            _, stream_generate = _mlx_lm()
+
             try:
-                iterator = stream_generate(model, tokenizer, prompt, max_tokens=max_tokens)
+                if prompt_cache is not None:
+                    iterator = stream_generate(
+                        model,
+                        tokenizer,
+                        suffix_prompt,
+                        max_tokens=max_tokens,
+                        prompt_cache=prompt_cache,
+                    )
+                else:
+                    iterator = stream_generate(model, tokenizer, prompt, max_tokens=max_tokens)
             except TypeError:
                 iterator = stream_generate(model, tokenizer, prompt=prompt, max_tokens=max_tokens)
 
@@ -2308,13 +3286,6 @@ class ResidentModelRuntime:
             return chunk["text"]
         return str(chunk)
 
-    def _sse_event(self, payload: Any) -> str:
-        if isinstance(payload, str):
-            body = payload
-        else:
-            body = json.dumps(payload, ensure_ascii=False)
-        return f"data: {body}\n\n"
-
     def _response_payload(self, response: InferenceResponse) -> dict[str, Any]:
         if hasattr(response, "model_dump"):
             return response.model_dump()  # pydantic v2
@@ -2326,13 +3297,15 @@ class ResidentModelRuntime:
         with self._lock:
             scheduled_at = self._last_active
 
-        thread = threading.Thread(
-            target=self._extract_and_merge_style_rules,
-            args=(final_output, scheduled_at),
-            name="ghosttype-style-learning",
-            daemon=True,
+        # 单工作线程 + 只保留最新任务:突发请求里旧任务反正会因
+        # scheduled_at 过期而自跳过,不如在排队阶段直接取消,队列深度
+        # 恒为 1,也免去每次请求起新线程的开销。
+        prev = self._style_learning_future
+        if prev is not None:
+            prev.cancel()
+        self._style_learning_future = self._style_executor.submit(
+            self._extract_and_merge_style_rules, final_output, scheduled_at
         )
-        thread.start()
 
     def _extract_and_merge_style_rules(self, final_output: str, scheduled_at: float) -> None:
         try:
@@ -2368,6 +3341,8 @@ class ResidentModelRuntime:
                 ],
                 max_tokens=96,
                 try_generation_lock=True,
+                abort_check=lambda: self._idle_state[0] > scheduled_at + 0.05,
+                stop_on_json=True,
             )
             if not rules_text.strip():
                 return
@@ -2391,7 +3366,7 @@ class ResidentModelRuntime:
                 profile["rules"] = merged[:20]
                 profile["updated_at"] = utc_now_iso()
                 self.style_profile_path.write_text(
-                    json.dumps(profile, ensure_ascii=False, indent=2),
+                    _json_dumps_pretty(profile),
                     encoding="utf-8",
                 )
         except Exception:
@@ -2406,7 +3381,7 @@ class ResidentModelRuntime:
         )
         answer = self._generate_chat(
             messages=[
-                {"role": "system", "content": prompt},
+                self._system_message(prompt),
                 {
                     "role": "user",
                     "content": (
@@ -2418,6 +3393,7 @@ class ResidentModelRuntime:
                 },
             ],
             max_tokens=120,
+            stop_on_json=True,
         )
         payload = extract_json_object(answer) or {}
         need = bool(payload.get("need_search"))
@@ -2425,213 +3401,119 @@ class ResidentModelRuntime:
         return SearchDecision(need_search=need and bool(query), query=query)
 
     def _run_duckduckgo(self, query: str, max_results: int) -> list[dict[str, str]]:
-        if DDGS is None:
+        ddgs_cls = _ddgs_cls()
+        if ddgs_cls is None:
             return []
-        sources: list[dict[str, str]] = []
         try:
-            with DDGS() as ddgs:
-                for item in ddgs.text(query, max_results=max_results):
-                    title = str(item.get("title") or "").strip()
-                    href = str(item.get("href") or "").strip()
-                    body = str(item.get("body") or "").strip()
-                    if not title and not href:
-                        continue
-                    sources.append({"title": title, "url": href, "snippet": body})
+            # 复用长连接客户端,省掉每次搜索的 TLS 握手;锁住是因为
+            # DDGS 实例不保证线程安全。
+            with self._ddgs_lock:
+                if self._ddgs_client is None:
+                    self._ddgs_client = ddgs_cls()
+                # DDGS 返回的就是 str,单次 strip 足够,不再逐字段 str()。
+                rows = [
+                    (
+                        (item.get("title") or "").strip(),
+                        (item.get("href") or "").strip(),
+                        (item.get("body") or "").strip(),
+                    )
+                    for item in self._ddgs_client.text(query, max_results=max_results)
+                ]
         except Exception:
+            # 连接状态可能已坏,丢弃客户端,下次搜索重建。
+            with self._ddgs_lock:
+                client, self._ddgs_client = self._ddgs_client, None
+            try:
+                if client is not None:
+                    client.__exit__(None, None, None)
+            except Exception:
+                pass
             return []
-        return sources
-
-    def run_dictate(self, req: DictateRequest) -> InferenceResponse:
-        audio_path = normalize_audio_path(req.audio_path)
-        max_tokens = self._clamp_max_tokens(req.max_tokens)
-        audio_config = self._audio_config_from_request(req)
-        qwen3_config = Qwen3ASRConfig(
-            use_system_prompt=req.qwen3_asr_use_system_prompt,
-            use_dictionary=req.qwen3_asr_use_dictionary,
-            system_prompt=req.qwen3_asr_system_prompt,
-        )
-        with self._inference_lock:
-            with self._lock:
-                self._apply_model_overrides(req.asr_model, req.llm_model)
-                self._touch()
-            asr_result = self._transcribe_audio(
-                audio_path,
-                language="auto",
-                audio_config=audio_config,
-                qwen3_config=qwen3_config,
-            )
-            raw_text = asr_result.text
-            t_asr = asr_result.timing_ms.get("asr", 0.0)
-
-            prompt = self._append_personalization_rules(
-                self._resolve_system_prompt(req.system_prompt, self._dictate_system_prompt())
-            )
-            user_prompt = self._dictate_user_prompt(raw_text)
-            with self._lock:
-                self._ensure_llm_loaded()
-            output, t_llm = self._run_llm_sync(
-                messages=[
-                    {"role": "system", "content": prompt},
-                    {"role": "user", "content": user_prompt},
-                ],
-                max_tokens=max_tokens,
-            )
+        return [
+            {"title": title, "url": href, "snippet": body}
+            for title, href, body in rows
+            if title or href
+        ]
 
-        self._start_style_learning_task(output)
-        return self._build_inference_response(
-            mode="dictate",
-            raw_text=raw_text,
-            output_text=output,
-            t_asr=t_asr,
-            t_llm=t_llm,
-            extra_timings=asr_result.timing_ms,
-        )
+    def _prepare_generation(self, req: Any) -> None:
+        """Apply per-request model overrides under the state lock (短临界区)."""
+        with self._lock:
+            self._apply_model_overrides(req.asr_model, req.llm_model)
+            self._touch()
 
-    def stream_dictate(self, req: DictateRequest):
+    def _transcribe_for_mode(self, req: Any) -> Any:
+        """Shared ASR front half: path/config prelude, overrides, slot-guarded ASR."""
         audio_path = normalize_audio_path(req.audio_path)
-        max_tokens = self._clamp_max_tokens(req.max_tokens)
         audio_config = self._audio_config_from_request(req)
         qwen3_config = Qwen3ASRConfig(
             use_system_prompt=req.qwen3_asr_use_system_prompt,
             use_dictionary=req.qwen3_asr_use_dictionary,
             system_prompt=req.qwen3_asr_system_prompt,
         )
-        with self._inference_lock:
-            with self._lock:
-                self._apply_model_overrides(req.asr_model, req.llm_model)
-                self._touch()
-            asr_result = self._transcribe_audio(
+        self._prepare_generation(req)
+        with self._asr_slots:
+            return self._transcribe_audio(
                 audio_path,
                 language="auto",
                 audio_config=audio_config,
                 qwen3_config=qwen3_config,
             )
-            raw_text = asr_result.text
-            t_asr = asr_result.timing_ms.get("asr", 0.0)
 
-            prompt = self._append_personalization_rules(
-                self._resolve_system_prompt(req.system_prompt, self._dictate_system_prompt())
-            )
-            user_prompt = self._dictate_user_prompt(raw_text)
-            with self._lock:
-                # Ensure model is loaded before releasing the inference lock.
-                self._ensure_llm_loaded()
-            messages = [
-                {"role": "system", "content": prompt},
-                {"role": "user", "content": user_prompt},
-            ]
-
-        def event_iterator():
-            yield from self._stream_mode_response(
-                mode="dictate",
-                raw_text=raw_text,
-                messages=messages,
-                max_tokens=max_tokens,
-                t_asr=t_asr,
-                extra_timings=asr_result.timing_ms,
-            )
-
-        return event_iterator()
-
-    def run_ask(self, req: AskRequest) -> InferenceResponse:
-        audio_path = normalize_audio_path(req.audio_path)
-        max_tokens = self._clamp_max_tokens(req.max_tokens)
-        audio_config = self._audio_config_from_request(req)
-        qwen3_config = Qwen3ASRConfig(
-            use_system_prompt=req.qwen3_asr_use_system_prompt,
-            use_dictionary=req.qwen3_asr_use_dictionary,
-            system_prompt=req.qwen3_asr_system_prompt,
+    def _prepare_mode_messages(
+        self, spec: ModeSpec, req: Any, raw_text: str
+    ) -> tuple[list[dict[str, str]], bool, list[dict[str, str]]]:
+        """Shared back half: optional web search, prompts, model load, messages."""
+        search_future = (
+            self._submit_ask_search_context(req, raw_text) if spec.uses_search else None
         )
-        with self._inference_lock:
-            with self._lock:
-                self._apply_model_overrides(req.asr_model, req.llm_model)
-                self._touch()
-            asr_result = self._transcribe_audio(
-                audio_path,
-                language="auto",
-                audio_config=audio_config,
-                qwen3_config=qwen3_config,
-            )
-            question = asr_result.text
-            t_asr = asr_result.timing_ms.get("asr", 0.0)
+        prompt = spec.system(self, req)
+        with self._lock:
+            self._ensure_llm_loaded()
+        if search_future is not None:
+            used_search, web_sources, search_text = self._collect_ask_search_context(search_future)
+        else:
+            used_search, web_sources, search_text = False, [], ""
+        user_prompt = spec.user(self, req, raw_text, search_text)
+        messages = [
+            self._system_message(prompt),
+            {"role": "user", "content": user_prompt},
+        ]
+        return messages, used_search, web_sources
 
-            used_search, web_sources, search_text = self._prepare_ask_search_context(req, question)
-            prompt = self._append_personalization_rules(
-                self._resolve_system_prompt(req.system_prompt, self._ask_system_prompt())
-            )
-            question_pack = self._ask_user_prompt(
-                selected_text=req.selected_text,
-                question=question,
-                search_text=search_text,
-            )
-            with self._lock:
-                self._ensure_llm_loaded()
-            output, t_llm = self._run_llm_sync(
-                messages=[
-                    {"role": "system", "content": prompt},
-                    {"role": "user", "content": question_pack},
-                ],
-                max_tokens=max_tokens,
-            )
+    def _run_mode(self, mode: str, req: Any) -> InferenceResponse:
+        spec = _MODE_SPECS[mode]
+        max_tokens = self._clamp_max_tokens(req.max_tokens)
+        asr_result = self._transcribe_for_mode(req)
+        raw_text = asr_result.text
+        messages, used_search, web_sources = self._prepare_mode_messages(spec, req, raw_text)
+        output, t_llm = self._run_llm_sync(messages=messages, max_tokens=max_tokens)
 
         self._start_style_learning_task(output)
         return self._build_inference_response(
-            mode="ask",
-            raw_text=question,
+            mode=spec.name,
+            raw_text=raw_text,
             output_text=output,
-            t_asr=t_asr,
+            t_asr=asr_result.timing_ms.get("asr", 0.0),
             t_llm=t_llm,
             used_web_search=used_search,
             web_sources=web_sources,
             extra_timings=asr_result.timing_ms,
         )
 
-    def stream_ask(self, req: AskRequest):
-        audio_path = normalize_audio_path(req.audio_path)
+    def _stream_mode(self, mode: str, req: Any):
+        spec = _MODE_SPECS[mode]
         max_tokens = self._clamp_max_tokens(req.max_tokens)
-        audio_config = self._audio_config_from_request(req)
-        qwen3_config = Qwen3ASRConfig(
-            use_system_prompt=req.qwen3_asr_use_system_prompt,
-            use_dictionary=req.qwen3_asr_use_dictionary,
-            system_prompt=req.qwen3_asr_system_prompt,
-        )
-        with self._inference_lock:
-            with self._lock:
-                self._apply_model_overrides(req.asr_model, req.llm_model)
-                self._touch()
-            asr_result = self._transcribe_audio(
-                audio_path,
-                language="auto",
-                audio_config=audio_config,
-                qwen3_config=qwen3_config,
-            )
-            question = asr_result.text
-            t_asr = asr_result.timing_ms.get("asr", 0.0)
-
-            used_search, web_sources, search_text = self._prepare_ask_search_context(req, question)
-            prompt = self._append_personalization_rules(
-                self._resolve_system_prompt(req.system_prompt, self._ask_system_prompt())
-            )
-            question_pack = self._ask_user_prompt(
-                selected_text=req.selected_text,
-                question=question,
-                search_text=search_text,
-            )
-            with self._lock:
-                # Ensure model is loaded before releasing the inference lock.
-                self._ensure_llm_loaded()
-            messages = [
-                {"role": "system", "content": prompt},
-                {"role": "user", "content": question_pack},
-            ]
+        asr_result = self._transcribe_for_mode(req)
+        raw_text = asr_result.text
+        messages, used_search, web_sources = self._prepare_mode_messages(spec, req, raw_text)
 
         def event_iterator():
             yield from self._stream_mode_response(
-                mode="ask",
-                raw_text=question,
+                mode=spec.name,
+                raw_text=raw_text,
                 messages=messages,
                 max_tokens=max_tokens,
-                t_asr=t_asr,
+                t_asr=asr_result.timing_ms.get("asr", 0.0),
                 used_web_search=used_search,
                 web_sources=web_sources,
                 extra_timings=asr_result.timing_ms,
@@ -2639,188 +3521,104 @@ class ResidentModelRuntime:
 
         return event_iterator()
 
-    def run_translate(self, req: TranslateRequest) -> InferenceResponse:
-        audio_path = normalize_audio_path(req.audio_path)
-        max_tokens = self._clamp_max_tokens(req.max_tokens)
-        audio_config = self._audio_config_from_request(req)
-        qwen3_config = Qwen3ASRConfig(
-            use_system_prompt=req.qwen3_asr_use_system_prompt,
-            use_dictionary=req.qwen3_asr_use_dictionary,
-            system_prompt=req.qwen3_asr_system_prompt,
-        )
-        with self._inference_lock:
-            with self._lock:
-                self._apply_model_overrides(req.asr_model, req.llm_model)
-                self._touch()
-            asr_result = self._transcribe_audio(
-                audio_path,
-                language="auto",
-                audio_config=audio_config,
-                qwen3_config=qwen3_config,
-            )
-            raw_text = asr_result.text
-            t_asr = asr_result.timing_ms.get("asr", 0.0)
-
-            prompt = self._append_personalization_rules(
-                self._resolve_system_prompt(req.system_prompt, self._translate_system_prompt(req.target_language))
-            )
-            user_prompt = self._translate_user_prompt(raw_text)
-            with self._lock:
-                self._ensure_llm_loaded()
-            output, t_llm = self._run_llm_sync(
-                messages=[
-                    {"role": "system", "content": prompt},
-                    {"role": "user", "content": user_prompt},
-                ],
-                max_tokens=max_tokens,
-            )
+    def run_dictate(self, req: DictateRequest) -> InferenceResponse:
+        return self._run_mode("dictate", req)
 
-        self._start_style_learning_task(output)
-        return self._build_inference_response(
-            mode="translate",
-            raw_text=raw_text,
-            output_text=output,
-            t_asr=t_asr,
-            t_llm=t_llm,
-            extra_timings=asr_result.timing_ms,
-        )
+    def stream_dictate(self, req: DictateRequest):
+        return self._stream_mode("dictate", req)
 
-    def stream_translate(self, req: TranslateRequest):
-        audio_path = normalize_audio_path(req.audio_path)
-        max_tokens = self._clamp_max_tokens(req.max_tokens)
-        audio_config = self._audio_config_from_request(req)
-        qwen3_config = Qwen3ASRConfig(
-            use_system_prompt=req.qwen3_asr_use_system_prompt,
-            use_dictionary=req.qwen3_asr_use_dictionary,
-            system_prompt=req.qwen3_asr_system_prompt,
-        )
-        with self._inference_lock:
-            with self._lock:
-                self._apply_model_overrides(req.asr_model, req.llm_model)
-                self._touch()
-            asr_result = self._transcribe_audio(
-                audio_path,
-                language="auto",
-                audio_config=audio_config,
-                qwen3_config=qwen3_config,
-            )
-            raw_text = asr_result.text
-            t_asr = asr_result.timing_ms.get("asr", 0.0)
+    def run_ask(self, req: AskRequest) -> InferenceResponse:
+        return self._run_mode("ask", req)
 
-            prompt = self._append_personalization_rules(
-                self._resolve_system_prompt(req.system_prompt, self._translate_system_prompt(req.target_language))
-            )
-            user_prompt = self._translate_user_prompt(raw_text)
-            with self._lock:
-                # Ensure model is loaded before releasing the inference lock.
-                self._ensure_llm_loaded()
-            messages = [
-                {"role": "system", "content": prompt},
-                {"role": "user", "content": user_prompt},
-            ]
+    def stream_ask(self, req: AskRequest):
+        return self._stream_mode("ask", req)
 
-        def event_iterator():
-            yield from self._stream_mode_response(
-                mode="translate",
-                raw_text=raw_text,
-                messages=messages,
-                max_tokens=max_tokens,
-                t_asr=t_asr,
-                extra_timings=asr_result.timing_ms,
-            )
+    def run_translate(self, req: TranslateRequest) -> InferenceResponse:
+        return self._run_mode("translate", req)
 
-        return event_iterator()
+    def stream_translate(self, req: TranslateRequest):
+        return self._stream_mode("translate", req)
+
+    def _pcm16_to_float32(self, pcm: np.ndarray) -> np.ndarray:
+        """Convert int16 samples to float32 in [-1, 1] using a reused scratch buffer.
+
+        np.multiply with an out-parameter hits the SIMD path without a fresh
+        4-byte-per-sample allocation each request. The returned array aliases
+        the scratch buffer and is only valid until the next conversion.
+        """
+        pcm = np.asarray(pcm, dtype=np.int16)
+        buf = self._f32_buf
+        if buf is None or buf.size < pcm.size:
+            buf = np.empty(pcm.size, dtype=np.float32)
+            self._f32_buf = buf
+        out = buf[: pcm.size]
+        # 乘法比除法在 NEON 上更快
+        np.multiply(pcm, np.float32(1.0 / 32768.0), out=out)
+        return out
 
     def run_asr_chunk(self, req: ASRChunkRequest) -> ASRChunkResponse:
-        audio_path = normalize_audio_path(req.audio_path)
-        audio_config = self._audio_config_from_request(req)
-        qwen3_config = Qwen3ASRConfig(
-            use_system_prompt=req.qwen3_asr_use_system_prompt,
-            use_dictionary=req.qwen3_asr_use_dictionary,
-            system_prompt=req.qwen3_asr_system_prompt,
-        )
-        with self._inference_lock:
-            with self._lock:
-                self._apply_model_overrides(req.asr_model, req.llm_model)
-                self._touch()
-            asr_result = self._transcribe_audio(
-                audio_path,
-                language="auto",
-                audio_config=audio_config,
-                qwen3_config=qwen3_config,
-            )
+        asr_result = self._transcribe_for_mode(req)
         return ASRChunkResponse(
             text=asr_result.text,
             timing_ms=asr_result.timing_ms,
         )
 
     def stream_prepared_transcript(self, req: PreparedTranscriptRequest):
-        raw_mode = str(req.mode or "dictate").strip().lower()
-        if raw_mode not in {"dictate", "ask", "translate"}:
+        raw_mode = (req.mode or "dictate").strip().lower()
+        if raw_mode not in _PREP_MODES:
             raise HTTPException(status_code=400, detail=f"Unsupported mode: {req.mode}")
 
-        raw_text = str(req.raw_text or "").strip()
+        raw_text = (req.raw_text or "").strip()
         if not raw_text:
             raise HTTPException(status_code=400, detail="raw_text must not be empty.")
 
         max_tokens = self._clamp_max_tokens(req.max_tokens)
 
         def event_iterator():
-            with self._inference_lock:
-                with self._lock:
-                    self._apply_model_overrides(req.asr_model, req.llm_model)
-                    self._touch()
-
-                extra_timings = {
-                    str(k): float(v)
-                    for k, v in (req.timing_ms or {}).items()
-                    if isinstance(v, (int, float))
-                }
-                t_asr = float(extra_timings.get("asr", 0.0))
+            self._prepare_generation(req)
 
-                if raw_mode == "dictate":
-                    prompt = self._append_personalization_rules(
-                        self._resolve_system_prompt(req.system_prompt, self._dictate_system_prompt())
-                    )
-                    user_prompt = self._dictate_user_prompt(raw_text)
-                    used_web_search = False
-                    web_sources: list[dict[str, str]] = []
-                    mode_name = "dictate"
-                elif raw_mode == "ask":
-                    ask_req = AskRequest(
-                        audio_path="/tmp/ghosttype-prepared-transcript-placeholder.wav",
-                        selected_text=req.selected_text,
-                        web_search_enabled=req.web_search_enabled,
-                        max_search_results=req.max_search_results,
-                    )
-                    used_web_search, web_sources, search_text = self._prepare_ask_search_context(ask_req, raw_text)
-                    prompt = self._append_personalization_rules(
-                        self._resolve_system_prompt(req.system_prompt, self._ask_system_prompt())
-                    )
-                    user_prompt = self._ask_user_prompt(
-                        selected_text=req.selected_text,
-                        question=raw_text,
-                        search_text=search_text,
-                    )
-                    mode_name = "ask"
-                else:
-                    prompt = self._append_personalization_rules(
-                        self._resolve_system_prompt(
-                            req.system_prompt,
-                            self._translate_system_prompt(req.target_language),
-                        )
-                    )
-                    user_prompt = self._translate_user_prompt(raw_text)
-                    used_web_search = False
-                    web_sources = []
-                    mode_name = "translate"
-
-                with self._lock:
-                    self._ensure_llm_loaded()
-                messages = [
-                    {"role": "system", "content": prompt},
-                    {"role": "user", "content": user_prompt},
-                ]
+            extra_timings = {
+                str(k): float(v)
+                for k, v in (req.timing_ms or {}).items()
+                if isinstance(v, (int, float))
+            }
+            t_asr = float(extra_timings.get("asr", 0.0))
+
+            if raw_mode == "dictate":
+                prompt = self._composed_prompt("dictate", req.system_prompt)
+                user_prompt = self._dictate_user_prompt(raw_text)
+                used_web_search = False
+                web_sources: list[dict[str, str]] = []
+                mode_name = "dictate"
+            elif raw_mode == "ask":
+                ask_req = AskRequest(
+                    audio_path="/tmp/ghosttype-prepared-transcript-placeholder.wav",
+                    selected_text=req.selected_text,
+                    web_search_enabled=req.web_search_enabled,
+                    max_search_results=req.max_search_results,
+                )
+                search_future = self._submit_ask_search_context(ask_req, raw_text)
+                prompt = self._composed_prompt("ask", req.system_prompt)
+                used_web_search, web_sources, search_text = self._collect_ask_search_context(search_future)
+                user_prompt = self._ask_user_prompt(
+                    selected_text=req.selected_text,
+                    question=raw_text,
+                    search_text=search_text,
+                )
+                mode_name = "ask"
+            else:
+                prompt = self._composed_prompt("translate", req.system_prompt, req.target_language)
+                user_prompt = self._translate_user_prompt(raw_text)
+                used_web_search = False
+                web_sources = []
+                mode_name = "translate"
+
+            with self._lock:
+                self._ensure_llm_loaded()
+            messages = [
+                self._system_message(prompt),
+                {"role": "user", "content": user_prompt},
+            ]
 
             yield from self._stream_mode_response(
                 mode=mode_name,
@@ -2836,33 +3634,49 @@ class ResidentModelRuntime:
         return event_iterator()
 
 
+_JSON_BRACE_RE = re.compile(r"\{.*\}", re.DOTALL)
+
+
 def extract_json_object(text: str) -> dict[str, Any] | None:
+    if len(text) < 2 or "{" not in text or "}" not in text:
+        return None
+
     candidate = text.strip()
     if candidate.startswith("{") and candidate.endswith("}"):
         try:
-            payload = json.loads(candidate)
+            payload = _json_loads(candidate)
             if isinstance(payload, dict):
                 return payload
-        except json.JSONDecodeError:
+        except ValueError:
             pass
 
-    match = re.search(r"\{.*\}", text, flags=re.DOTALL)
+    match = _JSON_BRACE_RE.search(text)
     if not match:
         return None
     try:
-        payload = json.loads(match.group(0))
-    except json.JSONDecodeError:
+        payload = _json_loads(match.group(0))
+    except ValueError:
         return None
     if isinstance(payload, dict):
         return payload
     return None
 
 
+@lru_cache(maxsize=256)
+def _resolve_audio_path(raw: str) -> str:
+    """Expand and resolve an audio path; cached per raw string.
+
+    重录/重试会反复提交同一路径,resolve() 的符号链接遍历没必要每次
+    重做。存在性检查不缓存——文件随时可能被客户端删掉。
+    """
+    return str(Path(raw).expanduser().resolve())
+
+
 def normalize_audio_path(path_value: str) -> str:
-    path = Path(path_value).expanduser().resolve()
-    if not path.exists():
+    path = _resolve_audio_path(path_value)
+    if not os.path.exists(path):
         raise HTTPException(status_code=404, detail=f"Audio file not found: {path}")
-    return str(path)
+    return path
 
 
 # =============================================================================
@@ -2891,6 +3705,49 @@ class DownloadProgressEvent:
         self.data = data
 
 
+class DirSizeTracker:
+    """Incremental cache-dir size polling built on os.scandir.
+
+    rglob("*") 每个 tick 都为全树分配 Path 对象并逐文件 stat。这里用
+    scandir 迭代,并利用 HF 缓存的不变性:下载中的文件以 .incomplete
+    结尾,落盘后的 blob 不再增长,所以见过一次的完整文件直接复用上次
+    的大小,每个 tick 只 stat 仍在增长的文件。
+    """
+
+    def __init__(self, root: Path) -> None:
+        self._root = str(root)
+        self._stable_sizes: dict[str, int] = {}
+
+    def poll(self) -> int:
+        if not os.path.isdir(self._root):
+            return 0
+        total = 0
+        stable = self._stable_sizes
+        stack = [self._root]
+        while stack:
+            try:
+                it = os.scandir(stack.pop())
+            except OSError:
+                continue
+            with it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                            continue
+                        cached = stable.get(entry.path)
+                        if cached is not None:
+                            total += cached
+                            continue
+                        size = entry.stat(follow_symlinks=False).st_size
+                    except OSError:
+                        continue
+                    total += size
+                    if not entry.name.endswith(".incomplete"):
+                        stable[entry.path] = size
+        return total
+
+
 class ModelDownloadManager:
     """Manages model downloads with progress tracking."""
     
@@ -2918,10 +3775,8 @@ class ModelDownloadManager:
 
     async def download_model_sse(self, repo_id: str) -> Any:
         """Download model and yield SSE progress events."""
-        import asyncio
-        import huggingface_hub as hf
-        import threading
-        
+        hf = _huggingface_hub()
+
         self._update_status(
             repo_id,
             status="downloading",
@@ -2935,7 +3790,7 @@ class ModelDownloadManager:
             started_at=utc_now_iso(),
         )
         
-        yield f"data: {json.dumps({'event': 'start', 'repo_id': repo_id, 'current_file': 'Connecting to Hugging Face...'})}\n\n"
+        yield _sse_event({'event': 'start', 'repo_id': repo_id, 'current_file': 'Connecting to Hugging Face...'})
         
         # Use threading.Event for synchronization
         done_event = threading.Event()
@@ -2944,34 +3799,76 @@ class ModelDownloadManager:
         cache_dir = Path.home() / ".cache" / "huggingface" / "hub"
         model_cache_dir = cache_dir / f"models--{repo_id.replace('/', '--')}"
         
-        def get_dir_size(path: Path) -> int:
-            """Get total size of directory."""
-            if not path.exists():
-                return 0
-            total = 0
-            try:
-                for f in path.rglob("*"):
-                    if f.is_file():
-                        try:
-                            total += f.stat().st_size
-                        except:
-                            pass
-            except:
-                pass
-            return total
-        
-        initial_size = get_dir_size(model_cache_dir)
-        start_time = time.time()
+        dir_size = DirSizeTracker(model_cache_dir)
+
+        # 进度优先走 tqdm 回调:snapshot_download 的每个文件进度条把
+        # (n, total) 推进队列,O(1) 读到真实 HTTP 字节数,不用每 300ms
+        # rglob 整个缓存树;tqdm 不可用时才退回目录扫描。
+        loop = asyncio.get_running_loop()
+        progress_evt = asyncio.Event()
+        progress_queue: queue.Queue = queue.Queue()
+        bar_state: dict[int, tuple[int, int, str]] = {}
+        bar_base: dict[int, int] = {}
+        try:
+            from tqdm.auto import tqdm as _tqdm_base
+        except Exception:
+            _tqdm_base = None
+
+        tqdm_class = None
+        if _tqdm_base is not None:
+
+            class _QueueTqdm(_tqdm_base):
+                def update(self, n: float = 1):
+                    displayed = super().update(n)
+                    # 只上报字节单位的文件进度条,跳过外层的文件计数条。
+                    if getattr(self, "unit", "") == "B":
+                        progress_queue.put_nowait(
+                            (id(self), int(self.n or 0), int(self.total or 0), str(self.desc or ""))
+                        )
+                        # 有字节落地就唤醒 SSE 循环,不用等轮询周期。
+                        loop.call_soon_threadsafe(progress_evt.set)
+                    return displayed
+
+            tqdm_class = _QueueTqdm
+
+        initial_size = 0 if tqdm_class is not None else dir_size.poll()
+        start_time = time.monotonic()
         print(f"[download] Starting download for {repo_id}, initial size: {initial_size}", flush=True)
-        
+
+        def drain_progress() -> tuple[int, int, int, str]:
+            """Fold queued tqdm samples into (downloaded, session, total, desc)."""
+            desc = ""
+            while True:
+                try:
+                    bar_id, n, total, bar_desc = progress_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if bar_id not in bar_base:
+                    # 首个样本可能带着断点续传的既有字节,作为会话基线。
+                    bar_base[bar_id] = n
+                bar_state[bar_id] = (n, total, bar_desc)
+                if bar_desc:
+                    desc = bar_desc
+            downloaded = sum(n for n, _, _ in bar_state.values())
+            session = sum(
+                max(0, n - bar_base.get(bar_id, 0))
+                for bar_id, (n, _, _) in bar_state.items()
+            )
+            total_bytes = sum(t for _, t, _ in bar_state.values())
+            return downloaded, session, total_bytes, desc
+
         def run_download():
             """Run the actual download in a thread."""
             try:
                 print(f"[download] Calling snapshot_download for {repo_id}", flush=True)
+                kwargs: dict[str, Any] = {}
+                if tqdm_class is not None:
+                    kwargs["tqdm_class"] = tqdm_class
                 result = hf.snapshot_download(
                     repo_id,
                     local_files_only=False,
                     resume_download=True,
+                    **kwargs,
                 )
                 download_result["path"] = result
                 print(f"[download] Download complete for {repo_id}", flush=True)
@@ -2992,38 +3889,56 @@ class ModelDownloadManager:
         # Stream progress events while download is running
         while not done_event.is_set():
             try:
-                # Wait before checking
-                await asyncio.sleep(0.3)
-                
-                # Check current download size
-                current_size = get_dir_size(model_cache_dir)
-                
+                # 事件驱动:tqdm 回调在有字节落地时立即唤醒;1s 超时兜底,
+                # 覆盖无 tqdm 的目录轮询回退,也保住心跳帧。
+                try:
+                    await asyncio.wait_for(progress_evt.wait(), timeout=1.0)
+                except asyncio.TimeoutError:
+                    pass
+                progress_evt.clear()
+
+                # 帧率上限 10/s:快速下载时把突发合并成一帧。
+                throttle = 0.1 - (time.monotonic() - last_emit_time)
+                if throttle > 0:
+                    await asyncio.sleep(throttle)
+
+                # Check current download progress
+                if tqdm_class is not None:
+                    current_size, session_bytes, total_bytes, desc = drain_progress()
+                else:
+                    current_size = dir_size.poll()
+                    session_bytes = current_size - initial_size
+                    total_bytes = 0
+                    desc = ""
+
                 # Calculate speed
-                now = time.time()
+                now = time.monotonic()
                 elapsed = now - start_time
                 speed_mbps = 0.0
                 if elapsed > 0:
-                    speed_mbps = (current_size - initial_size) / elapsed / (1024 * 1024)
-                
+                    speed_mbps = session_bytes / elapsed / (1024 * 1024)
+
                 # Emit progress when size changes or every second
                 should_emit = (current_size != last_size) or (now - last_emit_time >= 1.0)
-                
+
                 if should_emit:
                     progress_data = {
                         'event': 'progress',
                         'repo_id': repo_id,
                         'downloaded_bytes': current_size,
+                        'total_bytes': total_bytes,
                         'speed_mbps': round(speed_mbps, 2),
-                        'current_file': 'Downloading model files...',
+                        'current_file': desc or 'Downloading model files...',
                     }
                     print(f"[download] Progress: {current_size} bytes, {speed_mbps:.2f} MB/s", flush=True)
-                    yield f"data: {json.dumps(progress_data)}\n\n"
+                    yield _sse_event(progress_data)
                     
                     self._update_status(
                         repo_id,
                         downloaded_bytes=current_size,
+                        total_bytes=total_bytes,
                         speed_mbps=round(speed_mbps, 2),
-                        current_file="Downloading model files...",
+                        current_file=desc or "Downloading model files...",
                     )
                     
                     last_size = current_size
@@ -3032,32 +3947,76 @@ class ModelDownloadManager:
             except asyncio.CancelledError:
                 break
         
-        # Wait for download thread to complete
-        download_thread.join(timeout=2.0)
+        # done_event is set in the thread's finally block, so when the loop
+        # exits normally the thread is about to return and join() comes back
+        # immediately. If the loop broke on cancellation the download is
+        # still running; skip the join and let the daemon thread finish.
+        if done_event.is_set():
+            download_thread.join()
         
         print(f"[download] Download loop finished for {repo_id}, error: {download_result['error']}", flush=True)
         
         # Handle download result
         if download_result["error"]:
             self._update_status(repo_id, status="error", error_message=download_result["error"])
-            yield f"data: {json.dumps({'event': 'error', 'repo_id': repo_id, 'message': download_result['error']})}\n\n"
+            yield _sse_event({'event': 'error', 'repo_id': repo_id, 'message': download_result['error']})
         else:
             # Final size
-            final_size = get_dir_size(model_cache_dir)
-            
+            if tqdm_class is not None:
+                final_size, _, _, _ = drain_progress()
+            else:
+                final_size = dir_size.poll()
+
             # Verification phase
             self._update_status(repo_id, status="verifying", current_file="Verifying files...")
-            yield f"data: {json.dumps({'event': 'verifying', 'repo_id': repo_id})}\n\n"
+            yield _sse_event({'event': 'verifying', 'repo_id': repo_id})
             await asyncio.sleep(0.3)
             
             self._update_status(repo_id, status="complete", progress=100.0, downloaded_bytes=final_size)
-            yield f"data: {json.dumps({'event': 'complete', 'repo_id': repo_id, 'path': download_result['path'], 'downloaded_bytes': final_size})}\n\n"
+            yield _sse_event({'event': 'complete', 'repo_id': repo_id, 'path': download_result['path'], 'downloaded_bytes': final_size})
 
 
 # Global download manager instance
 download_manager = ModelDownloadManager()
 
 
+async def _stream_sync_events(events: Any) -> Any:
+    """Drain a blocking SSE generator on a worker thread, yielding frames async.
+
+    同步的 token 生成器放到执行器线程里跑,事件循环只负责从队列转发
+    帧;这样流式请求不会占着 Starlette 线程池,也不会在 CPU 密集的
+    token 生成上阻塞事件循环。客户端断开时置位 cancelled,生产者在
+    下一帧检查后退出。
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue[Any] = asyncio.Queue()
+    done = object()
+    cancelled = threading.Event()
+
+    def producer() -> None:
+        try:
+            for frame in events:
+                if cancelled.is_set():
+                    break
+                loop.call_soon_threadsafe(queue.put_nowait, frame)
+        except BaseException as exc:
+            loop.call_soon_threadsafe(queue.put_nowait, exc)
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, done)
+
+    loop.run_in_executor(None, producer)
+    try:
+        while True:
+            frame = await queue.get()
+            if frame is done:
+                break
+            if isinstance(frame, BaseException):
+                raise frame
+            yield frame
+    finally:
+        cancelled.set()
+
+
 def create_app(runtime: ResidentModelRuntime) -> FastAPI:
     @asynccontextmanager
     async def lifespan(_: FastAPI):
@@ -3080,9 +4039,11 @@ def create_app(runtime: ResidentModelRuntime) -> FastAPI:
         return runtime.run_dictate(req)
 
     @app.post("/dictate/stream")
-    def dictate_stream(req: DictateRequest) -> StreamingResponse:
+    async def dictate_stream(req: DictateRequest) -> StreamingResponse:
+        # ASR 在返回生成器之前同步发生,挪到线程上保持事件循环响应。
+        events = await asyncio.to_thread(runtime.stream_dictate, req)
         return StreamingResponse(
-            runtime.stream_dictate(req),
+            _stream_sync_events(events),
             media_type="text/event-stream",
             headers={"Cache-Control": "no-cache"},
         )
@@ -3092,9 +4053,10 @@ def create_app(runtime: ResidentModelRuntime) -> FastAPI:
         return runtime.run_ask(req)
 
     @app.post("/ask/stream")
-    def ask_stream(req: AskRequest) -> StreamingResponse:
+    async def ask_stream(req: AskRequest) -> StreamingResponse:
+        events = await asyncio.to_thread(runtime.stream_ask, req)
         return StreamingResponse(
-            runtime.stream_ask(req),
+            _stream_sync_events(events),
             media_type="text/event-stream",
             headers={"Cache-Control": "no-cache"},
         )
@@ -3104,9 +4066,10 @@ def create_app(runtime: ResidentModelRuntime) -> FastAPI:
         return runtime.run_translate(req)
 
     @app.post("/translate/stream")
-    def translate_stream(req: TranslateRequest) -> StreamingResponse:
+    async def translate_stream(req: TranslateRequest) -> StreamingResponse:
+        events = await asyncio.to_thread(runtime.stream_translate, req)
         return StreamingResponse(
-            runtime.stream_translate(req),
+            _stream_sync_events(events),
             media_type="text/event-stream",
             headers={"Cache-Control": "no-cache"},
         )
@@ -3116,9 +4079,10 @@ def create_app(runtime: ResidentModelRuntime) -> FastAPI:
         return runtime.run_asr_chunk(req)
 
     @app.post("/llm/stream")
-    def llm_stream(req: PreparedTranscriptRequest) -> StreamingResponse:
+    async def llm_stream(req: PreparedTranscriptRequest) -> StreamingResponse:
+        events = runtime.stream_prepared_transcript(req)
         return StreamingResponse(
-            runtime.stream_prepared_transcript(req),
+            _stream_sync_events(events),
             media_type="text/event-stream",
             headers={"Cache-Control": "no-cache"},
         )
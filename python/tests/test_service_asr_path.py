@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from pathlib import Path
 import tempfile
+from types import SimpleNamespace
 import unittest
 import wave
 
@@ -65,6 +66,33 @@ class ServiceASRPathTests(unittest.TestCase):
             self.assertEqual(ctx.exception.error_code, "asr_wav_format_unsupported")
             self.assertIn("未找到可用 ffmpeg", ctx.exception.human_message)
 
+    def test_silero_vad_engine_selected_through_audio_config(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            runtime = ResidentModelRuntime(state_dir=Path(temp_dir) / "state")
+
+            config = runtime._audio_config_from_request(SimpleNamespace(vad={"engine": "silero"}))
+            self.assertEqual(config.vad["engine"], "silero")
+
+            seen: dict[str, float] = {}
+
+            def fake_silero(frames: np.ndarray, threshold: float) -> np.ndarray:
+                seen["threshold"] = threshold
+                return np.ones(len(frames), dtype=np.bool_)
+
+            runtime._silero_vad_flags = fake_silero  # type: ignore[method-assign]
+
+            frames = np.zeros((4, 160), dtype=np.float32)
+            flags, stats = runtime._detect_speech_frames(
+                frames,
+                config,
+                vad_engine_override=config.vad.get("engine"),
+            )
+
+            self.assertEqual(stats["vad_backend"], "silero_onnx")
+            self.assertEqual(stats["vad_engine_requested"], "silero")
+            self.assertTrue(bool(flags.all()))
+            self.assertIn("threshold", seen)
+
     @unittest.skipIf(TestClient is None, "fastapi testclient requires httpx")
     def test_asr_endpoint_success_with_valid_wav_without_ffmpeg(self):
         with tempfile.TemporaryDirectory() as temp_dir: